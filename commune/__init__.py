@@ -1,2 +1,4 @@
+import os
 from .module import Module
-Module(globals()) # set the module functions as globals
+# c.<fn> is resolved on first use, COMMUNE_LAZY=0 syncs the module and sets every global at import
+Module(globals(), lazy=os.environ.get('COMMUNE_LAZY', '1') != '0')
@@ -1,46 +1,283 @@
 from Crypto import Random
 import hashlib
 from Crypto.Cipher import AES
-import copy
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
+from collections import OrderedDict
+import os
 import base64
+import binascii
+import itertools
+import struct
+import time
+import threading
 
 class Aes:
     """
     AES encryption and decryption class.
+    the data is encrypted with AES-GCM in authenticated chunks behind a versioned header
+    {magic}{version}{dtype}{chunk_size}{kdf}{master_salt}{salt}{nonce_prefix} so it can be streamed with constant memory,
+    the CBC blobs and version 1 and 2 streams are still decrypted
     """
-    def encrypt(self, data, password):
-        password = self.get_password(password)  
-        data = copy.deepcopy(data)
-        if not isinstance(data, str):
-            data = str(data)
-        data = data + (AES.block_size - len(data) % AES.block_size) * chr(AES.block_size - len(data) % AES.block_size)
-        iv = Random.new().read(AES.block_size)
-        cipher = AES.new(password, AES.MODE_CBC, iv)
-        encrypted_bytes = base64.b64encode(iv + cipher.encrypt(data.encode()))
-        return encrypted_bytes.decode() 
+    magic = b'CAES'
+    version = 3
+    header_formats = {1: '>BBI', 2: '>BBIB', 3: '>BBIB'} # version, dtype (0 str, 1 bytes), chunk_size, kdf
+    salt_size = 16
+    salt_counts = {1: 0, 2: 1, 3: 2} # version 3 has the salt of the master key and the salt of the blob
+    header_sizes = {1: len(magic) + struct.calcsize(header_formats[1]) + 8,
+                    2: len(magic) + struct.calcsize(header_formats[2]) + salt_size + 8,
+                    3: len(magic) + struct.calcsize(header_formats[3]) + 2 * salt_size + 8}
+    frame_format = '>IB' # the length of the chunk and whether it is the final one
+    frame_size = struct.calcsize(frame_format)
+    tag_size = 16
+    chunk_size = 1 << 20
+    # user passwords (str) are stretched with scrypt, key derived passwords (bytes) are hashed,
+    # the key of a blob is derived from that master key and the salt of the blob with hkdf
+    kdfs = {'sha256': 0, 'scrypt': 1}
+    scrypt_params = {'n': 2**15, 'r': 8, 'p': 1, 'maxmem': 2**26}
+    master_salt = os.urandom(salt_size) # the salt of the master keys this process encrypts with
+    key_cache = OrderedDict() # (password hash, master salt) -> the scrypt master key, least recently used first
+    key_cache_size = 1024
+    key_cache_lock = threading.Lock()
+
+    def encrypt(self, data, password) -> str:
+        """
+        encrypts the data (bytes are kept as bytes, anything else as str) into a base64 string,
+        the encrypted chunks are base64 encoded into one preallocated buffer instead of being joined first
+        """
+        dtype = 1 if isinstance(data, (bytes, bytearray, memoryview)) else 0
+        if dtype == 0:
+            data = (data if isinstance(data, str) else str(data)).encode()
+        view = memoryview(data)
+        chunks = (view[i:i+self.chunk_size] for i in range(0, len(view), self.chunk_size))
+        output = bytearray((self.encrypted_size(len(view)) + 2) // 3 * 4)
+        offset = 0
+        rest = b''
+        for piece in self.encrypt_stream(chunks, password, dtype=dtype):
+            piece = rest + piece if rest else memoryview(piece)
+            n = len(piece) - len(piece) % 3 # base64 encodes 3 bytes at a time
+            encoded = binascii.b2a_base64(piece[:n], newline=False)
+            output[offset:offset + len(encoded)] = encoded
+            offset += len(encoded)
+            rest = bytes(piece[n:])
+        encoded = binascii.b2a_base64(rest, newline=False)
+        output[offset:offset + len(encoded)] = encoded
+        assert offset + len(encoded) == len(output), 'wrong encrypted size'
+        return output.decode()
+
+    def encrypted_size(self, size:int, chunk_size:int = None) -> int:
+        """
+        the size of the stream encrypt_stream writes for size bytes
+        """
+        chunk_size = chunk_size or self.chunk_size
+        chunks = max(1, -(-size // chunk_size))
+        return self.header_sizes[self.version] + chunks * (self.frame_size + self.tag_size) + size
+
+    def decrypt(self, data, password:str):
+        # the base64 is decoded in pieces of whole chunks so only the plaintext is held in full
+        step = 4 * (self.chunk_size // 3)
+        pieces = (binascii.a2b_base64(data[i:i+step]) for i in range(0, len(data), step))
+        first = next(pieces, b'')
+        if not self.is_stream(first):
+            return self.decrypt_cbc(base64.b64decode(data), password)
+        dtype = self.read_header(first)['dtype']
+        data = b''.join(self.decrypt_stream(itertools.chain([first], pieces), password))
+        return data.decode('utf-8') if dtype == 0 else data
 
-    def decrypt(self, data, password:str):  
-        password = self.get_password(password)  
-        data = base64.b64decode(data)
+    def decrypt_cbc(self, data:bytes, password:str) -> str:
+        password = self.get_password(password)
         iv = data[:AES.block_size]
         cipher = AES.new(password, AES.MODE_CBC, iv)
         data =  cipher.decrypt(data[AES.block_size:])
         data = data[:-ord(data[len(data)-1:])].decode('utf-8')
         return data
 
+    def is_stream(self, data:bytes) -> bool:
+        return len(data) > len(self.magic) and data[:len(self.magic)] == self.magic and data[len(self.magic)] in self.header_sizes
+
+    def read_header(self, data:bytes) -> dict:
+        """
+        parses the header at the start of the data, None if the data is too short
+        """
+        assert self.is_stream(data), 'invalid header'
+        version = data[len(self.magic)]
+        size = self.header_sizes[version]
+        if len(data) < size:
+            return None
+        header_format = self.header_formats[version]
+        fields = struct.unpack(header_format, data[len(self.magic):len(self.magic) + struct.calcsize(header_format)])
+        kdf = fields[3] if version >= 2 else self.kdfs['sha256']
+        salts = bytes(data[size - 8 - self.salt_counts[version] * self.salt_size:size - 8])
+        master_salt, salt = (salts[:self.salt_size], salts[self.salt_size:]) if version >= 3 else (None, salts)
+        return {'version': version, 'dtype': fields[1], 'chunk_size': fields[2], 'kdf': kdf, 
+                'master_salt': master_salt, 'salt': salt, 'header': bytes(data[:size])}
+
+    def derive_key(self, password, kdf:int, salt:bytes = b'', master_salt:bytes = None) -> bytes:
+        """
+        derives the aes key of the blob from the master key of the password with hkdf over the salt of the blob,
+        the blobs before version 3 (no master salt) use the master key itself
+        """
+        key = self.master_key(password, kdf=kdf, salt=salt if master_salt == None else master_salt)
+        if master_salt == None:
+            return key
+        return HKDF(key, 32, salt, SHA256, context=self.magic)
+
+    def master_key(self, password, kdf:int, salt:bytes = b'') -> bytes:
+        """
+        the key stretched from the password, the scrypt keys are cached so scrypt runs once per (password, master salt)
+        """
+        if not isinstance(password, bytes):
+            password = str(password).encode()
+        if kdf == self.kdfs['sha256']:
+            return hashlib.sha256(password).digest() # unsalted and as cheap as a cache lookup
+        if kdf != self.kdfs['scrypt']:
+            raise ValueError(f'unknown kdf {kdf}')
+        cache_key = (hashlib.sha256(password).digest(), salt)
+        with self.key_cache_lock:
+            if cache_key in self.key_cache:
+                self.key_cache.move_to_end(cache_key)
+                return self.key_cache[cache_key]
+        key = hashlib.scrypt(password, salt=salt, dklen=32, **self.scrypt_params)
+        with self.key_cache_lock:
+            self.key_cache[cache_key] = key
+            while len(self.key_cache) > self.key_cache_size:
+                self.key_cache.popitem(last=False)
+        return key
+
+    def get_cipher(self, password:bytes, header:bytes, index:int, final:bool):
+        cipher = AES.new(password, AES.MODE_GCM, nonce=header[-8:] + struct.pack('>I', index))
+        cipher.update(header + bytes([final])) # binds the chunk to the stream and marks the end
+        return cipher
+
+    def split(self, chunks, chunk_size:int):
+        """
+        regroups the chunks into pieces of chunk_size and marks the final one
+        """
+        buffer = bytearray()
+        pending = None
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not buffer and len(chunk) == chunk_size:
+                pieces = [chunk]
+            else:
+                buffer += chunk
+                pieces = []
+                while len(buffer) >= chunk_size:
+                    pieces.append(bytes(buffer[:chunk_size]))
+                    del buffer[:chunk_size]
+            for piece in pieces:
+                if pending is not None:
+                    yield pending, False
+                pending = piece
+        if buffer or pending is None:
+            if pending is not None:
+                yield pending, False
+            yield bytes(buffer), True
+        else:
+            yield pending, True
+
+    def encrypt_stream(self, chunks, password, chunk_size:int = None, dtype:int = 1):
+        """
+        encrypts an iterator of bytes into an iterator of bytes
+        """
+        chunk_size = chunk_size or self.chunk_size
+        kdf = self.kdfs['scrypt'] if isinstance(password, str) else self.kdfs['sha256']
+        salt = os.urandom(self.salt_size) # every blob gets its own salt so no two blobs share a key
+        password = self.derive_key(password, kdf=kdf, salt=salt, master_salt=self.master_salt)
+        header = self.magic + struct.pack(self.header_formats[self.version], self.version, dtype, chunk_size, kdf) 
+        header += self.master_salt + salt + Random.new().read(8)
+        yield header
+        for index, (chunk, final) in enumerate(self.split(chunks, chunk_size)):
+            ciphertext, tag = self.get_cipher(password, header, index, final).encrypt_and_digest(chunk)
+            yield struct.pack(self.frame_format, len(ciphertext), final)
+            yield ciphertext
+            yield tag
+
+    def decrypt_stream(self, chunks, password):
+        """
+        decrypts an iterator of bytes from encrypt_stream, every chunk is authenticated before it is yielded
+        """
+        header = None
+        final = False
+        index = 0
+        buffer, offset = b'', 0
+        for chunk in chunks:
+            # only the unparsed tail (less than a frame) is copied
+            buffer = bytes(buffer[offset:]) + chunk if offset < len(buffer) else chunk
+            offset = 0
+            view = memoryview(buffer)
+            if header == None:
+                if len(view) <= len(self.magic):
+                    continue
+                header = self.read_header(view)
+                if header == None:
+                    continue
+                key = self.derive_key(password, kdf=header['kdf'], salt=header['salt'], master_salt=header['master_salt'])
+                header = header['header']
+                offset = len(header)
+            while len(view) - offset >= self.frame_size:
+                length, is_final = struct.unpack(self.frame_format, view[offset:offset + self.frame_size])
+                end = offset + self.frame_size + length + self.tag_size
+                if len(view) < end:
+                    break
+                if final:
+                    raise ValueError('data after the final chunk')
+                ciphertext = view[offset + self.frame_size:end - self.tag_size]
+                cipher = self.get_cipher(key, header, index, bool(is_final))
+                yield cipher.decrypt_and_verify(ciphertext, view[end - self.tag_size:end])
+                final = bool(is_final)
+                index += 1
+                offset = end
+        if not final:
+            raise ValueError('the encrypted data is truncated')
+
+    def encrypt_file(self, path:str, password, output_path:str = None, chunk_size:int = None) -> dict:
+        """
+        encrypts the file in chunks (in place if there is no output_path)
+        """
+        return self.transform_file(path, lambda chunks: self.encrypt_stream(chunks, password, chunk_size=chunk_size), output_path=output_path, chunk_size=chunk_size)
+
+    def decrypt_file(self, path:str, password, output_path:str = None) -> dict:
+        return self.transform_file(path, lambda chunks: self.decrypt_stream(chunks, password), output_path=output_path)
+
+    def transform_file(self, path:str, fn:callable, output_path:str = None, chunk_size:int = None) -> dict:
+        path = os.path.abspath(os.path.expanduser(path))
+        output_path = os.path.abspath(os.path.expanduser(output_path or path))
+        tmp_path = f'{output_path}.{os.getpid()}.tmp'
+        chunk_size = chunk_size or self.chunk_size
+        try:
+            with open(path, 'rb') as f, open(tmp_path, 'wb') as out:
+                for chunk in fn(iter(lambda: f.read(chunk_size), b'')):
+                    out.write(chunk)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return {'success': True, 'path': output_path, 'size': os.path.getsize(output_path)}
+
     def get_password(self, password:str):
-        if isinstance(password, str):
-            password = password.encode()
-        # if password is a key, use the key's private key as password
-        return hashlib.sha256(password).digest()
-
-    def test(self,  values = [10, 'fam', 'hello world'], password='1234'):
-        if isinstance(crypto_type, list):
-            return [self.test_encryption(values=values, crypto_type=k) for k in crypto_type]
+        # the key of the legacy CBC blobs
+        return self.derive_key(password, kdf=self.kdfs['sha256'])
+
+    def test(self,  values = [10, 'fam', 'hello world', b'\x00bytes', 'x' * 3000000], password='1234'):
         for value in values:
-            value = str(value)
-            key = Key(crypto_type=crypto_type)
-            enc = key.encrypt(value, password)
-            dec = key.decrypt(enc, password)
-            assert dec == value, f'encryption failed, {dec} != {value}'
-        return {'encrypted':enc, 'decrypted': dec, 'crypto_type':key.crypto_type}
+            value = value if isinstance(value, bytes) else str(value)
+            enc = self.encrypt(value, password)
+            dec = self.decrypt(enc, password)
+            assert dec == value, f'encryption failed, {dec[:100]} != {value[:100]}'
+        headers = [self.read_header(base64.b64decode(self.encrypt('x', password))) for _ in range(2)]
+        assert headers[0]['salt'] != headers[1]['salt'], 'the salt should be unique per blob'
+        assert headers[0]['master_salt'] == headers[1]['master_salt'] == self.master_salt
+        # scrypt runs once for the master key, the blob keys are derived from it
+        t0 = time.time()
+        for _ in range(10):
+            assert self.decrypt(self.encrypt('x', password), password) == 'x'
+        assert time.time() - t0 < 1, 'the master key should be cached'
+        enc = base64.b64decode(self.encrypt(values[-1], password))
+        try:
+            self.decrypt(base64.b64encode(enc[:-1000]), password)
+            raise AssertionError('truncated data should not decrypt')
+        except ValueError:
+            pass
+        return {'success': True, 'msg': 'aes test passed'}
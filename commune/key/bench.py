@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import subprocess
+import commune as c
+
+Key = c.module('key')
+
+class Bench:
+    """
+    benchmarks the key subsystem (sign, verify, encoding, get_key and aes)
+    the results are {metric: ops per second} so higher is better for every metric,
+    each run is saved as json and can be compared against a baseline run with a regression threshold
+    """
+    crypto_types = ['sr25519', 'ed25519', 'ecdsa']
+
+    def __init__(self, path:str = '~/.commune/bench/key'):
+        self.path = os.path.abspath(os.path.expanduser(path))
+
+    def measure(self, fn:callable, n:int = 100, warmup:int = 5) -> float:
+        """
+        the ops per second of fn over n calls
+        """
+        for _ in range(warmup):
+            fn()
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return n / (time.perf_counter() - t0)
+
+    def payload(self, size:int) -> dict:
+        return {'fn': 'info', 'params': {'data': 'x' * size}, 'time': time.time()}
+
+    def bench_signatures(self, n:int = 100, sizes:list = [100, 10000]) -> dict:
+        results = {}
+        for crypto_type in self.crypto_types:
+            key = Key(crypto_type=crypto_type)
+            for size in sizes:
+                data = self.payload(size)
+                signature = key.sign(data)
+                results[f'sign/{crypto_type}/{size}'] = self.measure(lambda: key.sign(data), n=n)
+                results[f'verify/{crypto_type}/{size}'] = self.measure(lambda: key.verify(data, signature, public_key=key.public_key, crypto_type=crypto_type), n=n)
+            items = [{'data': data, 'signature': signature, 'public_key': key.public_key, 'crypto_type': crypto_type}] * n
+            # the plain loop is the baseline of verify_batch (ops per second of both)
+            results[f'verify_loop/{crypto_type}'] = n * self.measure(lambda: [key.verify(**item) for item in items], n=1, warmup=0)
+            results[f'verify_batch/{crypto_type}'] = n * self.measure(lambda: key.verify_batch(items), n=1, warmup=0)
+        return results
+
+    def bench_encoding(self, n:int = 1000, sizes:list = [100, 10000, 1000000]) -> dict:
+        key = Key()
+        results = {}
+        for size in sizes:
+            data = self.payload(size)
+            results[f'encode/{size}'] = self.measure(lambda: key.encode_signature_data(data), n=n)
+        return results
+
+    def bench_get_key(self, n:int = 100, path:str = 'test.bench') -> dict:
+        key = Key()
+        key.add_key(path)
+        results = {
+            'get_key/cold': self.measure(lambda: key.get_key(path, cache=False), n=n),
+            'get_key/warm': self.measure(lambda: key.get_key(path), n=n),
+        }
+        key.rm_key(path)
+        return results
+
+    def bench_aes(self, n:int = 5, size:int = 10000000) -> dict:
+        key = Key()
+        data = os.urandom(size)
+        encrypted = key.encrypt(data)
+        mb = size / 1e6
+        return {
+            'aes/encrypt_mb': mb * self.measure(lambda: key.encrypt(data), n=n, warmup=1),
+            'aes/decrypt_mb': mb * self.measure(lambda: key.decrypt(encrypted), n=n, warmup=1),
+        }
+
+    def commit(self) -> str:
+        try:
+            return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL).decode().strip()
+        except Exception:
+            return None
+
+    def run(self, n:int = 100, save:bool = True) -> dict:
+        """
+        runs every benchmark and saves the run to {path}/{time}.json,
+        compare it with the previous run with c.module('key.bench')().compare()
+        """
+        results = {}
+        results.update(self.bench_signatures(n=n))
+        results.update(self.bench_encoding(n=n * 10))
+        results.update(self.bench_get_key(n=n))
+        results.update(self.bench_aes())
+        run = {'time': time.time(), 'commit': self.commit(), 'n': n, 'results': results}
+        if save:
+            os.makedirs(self.path, exist_ok=True)
+            with open(f'{self.path}/{int(run["time"])}.json', 'w') as f:
+                json.dump(run, f, indent=2)
+        return run
+
+    def runs(self) -> list:
+        return sorted([f'{self.path}/{f}' for f in os.listdir(self.path) if f.endswith('.json')]) if os.path.exists(self.path) else []
+
+    def load(self, run=None) -> dict:
+        """
+        loads a run from a path (the latest run if None)
+        """
+        if isinstance(run, dict):
+            return run
+        if run == None:
+            runs = self.runs()
+            assert len(runs) > 0, f'no runs in {self.path}'
+            run = runs[-1]
+        with open(run) as f:
+            return json.load(f)
+
+    def compare(self, run=None, baseline=None, threshold:float = 0.1) -> dict:
+        """
+        compares a run with a baseline (the run before the latest by default),
+        a metric regresses if it is more than threshold slower than the baseline
+        """
+        if baseline == None:
+            runs = self.runs()
+            if run == None:
+                assert len(runs) > 1, f'need two runs in {self.path} to compare'
+                run, baseline = runs[-1], runs[-2]
+            else:
+                assert len(runs) > 0, f'no runs in {self.path} to compare with'
+                baseline = runs[-1]
+        run, baseline = self.load(run), self.load(baseline)
+        changes = {}
+        for metric, value in run['results'].items():
+            if metric in baseline['results']:
+                changes[metric] = value / baseline['results'][metric] - 1
+        regressions = {k: v for k, v in changes.items() if v < -threshold}
+        return {'success': len(regressions) == 0,
+                'commits': [baseline.get('commit'), run.get('commit')],
+                'threshold': threshold,
+                'regressions': regressions,
+                'changes': changes}
+
+    def test(self):
+        bench = Bench(path='~/.commune/bench/key/test')
+        results = {'a': 100.0, 'b': 100.0}
+        baseline = {'results': results}
+        run = {'results': {'a': 95.0, 'b': 50.0}}
+        comparison = bench.compare(run=run, baseline=baseline, threshold=0.1)
+        assert list(comparison['regressions'].keys()) == ['b'], comparison
+        assert bench.measure(lambda: None, n=10) > 0
+        return {'success': True, 'msg': 'bench test passed'}
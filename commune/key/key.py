@@ -1,7 +1,16 @@
 
-from typing import Union, Optional
+from typing import Union, Optional, List
 import time
 import os
+import fcntl
+import ctypes
+import ctypes.util
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import pickle
 import binascii
 import re
 import secrets
@@ -24,13 +33,14 @@ from copy import deepcopy
 import hmac
 import struct
 from eth_keys.datatypes import Signature, PrivateKey
+from commune.utils import python2str
 from .utils import (extract_derive_path, 
-                    python2str, 
                     ss58_encode, 
                     ss58_decode, get_ss58_format, 
                     is_valid_ss58_address,
                      b64encode, 
                      mnemonic_to_ecdsa_private_key, 
+                     clear_bip32_cache, 
                      ecdsa_sign, 
                      str2bytes,
                      ecdsa_verify)
@@ -51,6 +61,22 @@ class Key:
     ss58_format = 42
     crypto_type =  'sr25519'
     language_code = 'en'
+    key_index = {} # storage_path -> the key index, shared by the instances of the process
+    key_cache = OrderedDict() # (path, crypto_type, mtime) -> the decoded key, least recently used first
+    key_cache_size = 128
+    key_cache_lock = threading.Lock()
+    lock_memory = False # mlock the process when keys are cached
+    memory_locked = None
+    public_key_cache = OrderedDict() # address -> the decoded public key, least recently used first
+    public_key_cache_size = 10000
+    public_key_cache_stats = {'hits': 0, 'misses': 0}
+    public_key_cache_lock = threading.Lock()
+    batch_min_items = {'sr25519': 2000, 'ed25519': 2000, 'ecdsa': 16} # the items of a crypto_type for which verify_batch uses a process pool (~100us vs ~10ms per verify)
+    process_pool = None # the persistent pool of verify_batch and new_key_jsons (see map_pool)
+    process_pool_pid = None
+    process_pool_lock = threading.Lock()
+    process_pool_context = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    pool_key = None # the key of a pool worker (see call_pool_key)
 
     def __init__(self,
                  private_key: Union[bytes, str] = None, 
@@ -147,9 +173,84 @@ class Key:
             assert crypto_type == key_json['crypto_type'], f'crypto_type mismatch {crypto_type} != {key_json["crypto_type"]}'
             path = self.resolve_path(path) + '/' + crypto_type+ '/' + key.key_address + '.json'
             c.put(path, key_json)
+            self.index_key(path)
             assert self.key_exists(path, crypto_type=crypto_type), f'key does not exist at {path}'
         return self.get_key(path, crypto_type=crypto_type)
     
+    def new_key_json(self, crypto_type=None) -> dict:
+        return json.loads(self.new_key(crypto_type=crypto_type).to_json())
+
+    def new_key_jsons(self, n:int, crypto_type=None, max_workers:int = None) -> List[dict]:
+        """
+        generates the json of n new keys in the process pool (the derivations are cpu bound)
+        """
+        crypto_type = self.get_crypto_type(crypto_type)
+        max_workers = min(max_workers or os.cpu_count() or 1, n)
+        key_jsons = None
+        if max_workers > 1:
+            key_jsons = self.map_pool(['new_key_json'] * n, [crypto_type] * n, max_workers=max_workers, chunksize=max(1, n // (max_workers * 4)))
+        if key_jsons == None:
+            key_jsons = [self.new_key_json(crypto_type) for _ in range(n)]
+        return key_jsons
+
+    def map_pool(self, fns:List[str], *args, max_workers:int = None, chunksize:int = 1) -> Optional[list]:
+        """
+        maps the key methods over the args in the persistent process pool (forkserver, as forking a threaded server can deadlock),
+        None if this process cannot have one (daemonic processes cannot have children) or it fails to start
+        """
+        if multiprocessing.current_process().daemon:
+            return None
+        pool = None
+        try:
+            with Key.process_pool_lock:
+                if Key.process_pool == None or Key.process_pool_pid != os.getpid():
+                    context = multiprocessing.get_context(self.process_pool_context)
+                    Key.process_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+                    Key.process_pool_pid = os.getpid()
+                pool = Key.process_pool
+            return list(pool.map(call_pool_key, fns, *args, chunksize=chunksize))
+        except (OSError, RuntimeError, AssertionError, pickle.PicklingError, BrokenProcessPool) as e:
+            c.print(f'KeyPoolError({e}), running in process', color='red')
+            with Key.process_pool_lock:
+                if Key.process_pool == pool:
+                    Key.process_pool = None
+            return None
+
+    def new_keys(self, n:int = 10, crypto_type=None, prefix:str = None, max_workers:int = None) -> Union[List['Key'], dict]:
+        """
+        generates n keys in parallel, if a prefix is given they are saved as {prefix}{i}
+        """
+        if prefix != None:
+            return self.add_keys([f'{prefix}{i}' for i in range(n)], crypto_type=crypto_type, max_workers=max_workers)
+        return [self.from_json(key_json) for key_json in self.new_key_jsons(n, crypto_type=crypto_type, max_workers=max_workers)]
+
+    def add_keys(self, names:List[str], crypto_type=None, refresh:bool = False, max_workers:int = None) -> dict:
+        """
+        generates the missing keys of the names in parallel and saves them in one pass,
+        the key files are replaced atomically and indexed under one lock
+        """
+        crypto_type = self.get_crypto_type(crypto_type)
+        names = [name for name in names if refresh or not self.key_exists(name, crypto_type=crypto_type)]
+        if len(names) == 0:
+            return {}
+        key_jsons = self.new_key_jsons(len(names), crypto_type=crypto_type, max_workers=max_workers)
+        path2tmp = {}
+        try:
+            for name, key_json in zip(names, key_jsons):
+                path = self.resolve_path(name) + '/' + crypto_type + '/' + key_json['key_address'] + '.json'
+                path2tmp[path] = f'{path}.{os.getpid()}.tmp'
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path2tmp[path], 'w') as f:
+                    json.dump({'data': key_json, 'encrypted': False, 'timestamp': time.time()}, f)
+            for path, tmp_path in path2tmp.items():
+                os.replace(tmp_path, path)
+        finally:
+            for tmp_path in path2tmp.values():
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self.index_keys(list(path2tmp.keys()))
+        return {name: key_json['key_address'] for name, key_json in zip(names, key_jsons)}
+
     def mv_key(self, path, new_path):
         new_path = self.get_key_path(new_path)
         key = self.get_key(path)
@@ -159,8 +260,10 @@ class Key:
         if not c.exists(new_key_path_dir):
             os.makedirs(new_key_path_dir)
         c.put(new_key_path, key_json)
-        old_key_path = self.get_key_path(path)
+        self.index_key(new_key_path)
+        old_key_path = self.get_key_path(path, crypto_type=key.crypto_type)
         c.rm(old_key_path)
+        self.unindex_key(old_key_path.split('/')[-3], crypto_type=key.crypto_type)
         assert self.key_exists(new_key_path), f'key does not exist at {new_key_path}'
         assert not self.key_exists(old_key_path), f'key still exists at {old_key_path}'
         return {'success': True, 'from': path , 'to': new_path}
@@ -183,6 +286,7 @@ class Key:
                 create_if_not_exists:bool = True, 
                 prompt_password:bool = False,
                 crypto_type=None, 
+                cache:bool = True,
                 **kwargs):
         
         crypto_type = self.get_crypto_type(crypto_type)
@@ -198,15 +302,61 @@ class Key:
                 key = self.add_key(path, **kwargs) # create key
             else:
                 raise ValueError(f'key does not exist at --> {path}')
-        key_json = self.get_key_data(path)
+        key_path = self.get_key_path(path, crypto_type=self.crypto_type)
+        cache_key = None
+        if cache and os.path.exists(key_path):
+            # the mtime invalidates the cached key when the file is rewritten
+            cache_key = (key_path, crypto_type, os.path.getmtime(key_path))
+            with self.key_cache_lock:
+                if cache_key in self.key_cache:
+                    self.key_cache.move_to_end(cache_key)
+                    return self.key_cache[cache_key]
+        key_json = self.get_key_data(key_path)
         if self.is_encrypted(key_json):
+            cache_key = None # decrypted keys are not kept in memory
             if prompt_password and password == None:
                 password = input(f'enter password to decrypt {path} ')
             key_json = c.decrypt(data=key_json, password=password)
         key_json = json.loads(key_json) if isinstance(key_json, str) else key_json
         key =  self.from_json(key_json, crypto_type=crypto_type)
+        if cache_key != None:
+            self.cache_key(cache_key, key)
         return key
 
+    def cache_key(self, cache_key:tuple, key:'Key'):
+        if self.lock_memory:
+            self.lock_secrets()
+        with self.key_cache_lock:
+            self.key_cache[cache_key] = key
+            while len(self.key_cache) > self.key_cache_size:
+                self.key_cache.popitem(last=False)
+
+    def evict_key(self, path:str = None) -> int:
+        """
+        drops the cached keys of a name or key file (all of them if the path is None)
+        and the memoized bip32 nodes, which are not tracked per key
+        """
+        with self.key_cache_lock:
+            evicted = [k for k in self.key_cache if path == None or path in (k[0], k[0].split('/')[-3])]
+            for k in evicted:
+                self.key_cache.pop(k)
+        clear_bip32_cache()
+        return len(evicted)
+
+    def lock_secrets(self) -> bool:
+        """
+        locks the memory of the process (mlockall) so the cached secrets are never swapped to disk,
+        the bip32 nodes derived before the lock are dropped as they may already be in swap
+        """
+        if Key.memory_locked == None:
+            clear_bip32_cache()
+            MCL_CURRENT, MCL_FUTURE = 1, 2
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            Key.memory_locked = libc.mlockall(MCL_CURRENT | MCL_FUTURE) == 0
+            if not Key.memory_locked:
+                c.print(f'Failed to lock the key cache in memory (errno {ctypes.get_errno()})', color='red')
+        return Key.memory_locked
+
     def get_keys(self, search=None, clean_failed_keys=False):
         keys = {}
         for key in self.keys():
@@ -221,34 +371,155 @@ class Key:
                     keys.pop(key) 
         return keys
 
+    @property
+    def index_path(self) -> str:
+        return self.storage_path + '_index.json'
+
+    def index_entry(self, path:str) -> dict:
+        dir_path = os.path.dirname(path)
+        return {'path': path, 'address': path.split('/')[-1].split('.')[0], 'crypto_type': path.split('/')[-2],
+                'dir_mtime': os.path.getmtime(dir_path) if os.path.exists(dir_path) else 0}
+
+    def entry_changed(self, entry:dict) -> bool:
+        """
+        whether the key file of the entry was removed or its directory changed ({name}/{crypto_type}) behind the index
+        """
+        try:
+            return not os.path.exists(entry['path']) or os.path.getmtime(os.path.dirname(entry['path'])) != entry.get('dir_mtime')
+        except OSError:
+            return True
+
+    def scan_keys(self) -> dict:
+        """
+        scans the key directory for {name}/{crypto_type}/{address}.json (the latest file of a name wins)
+        """
+        keys = {crypto_type: {} for crypto_type in self.crypto_types}
+        if not os.path.isdir(self.storage_path):
+            return keys
+        for name in os.listdir(self.storage_path):
+            for crypto_type, entry in self.scan_name(name).items():
+                keys[crypto_type][name] = entry
+        return keys
+
+    def scan_name(self, name:str) -> dict:
+        """
+        the entries of the key files of a name {crypto_type: entry}
+        """
+        entries = {}
+        for crypto_type in self.crypto_types:
+            crypto_path = f'{self.storage_path}/{name}/{crypto_type}'
+            if not os.path.isdir(crypto_path):
+                continue
+            files = [f'{crypto_path}/{f}' for f in os.listdir(crypto_path) if f.endswith('.json')]
+            if len(files) >= 1:
+                entries[crypto_type] = self.index_entry(max(files, key=os.path.getmtime))
+        return entries
+
+    def rescan_name(self, name:str) -> dict:
+        """
+        rescans the key files of one name into the index instead of the whole key directory,
+        the index is only written if they changed
+        """
+        entries = self.scan_name(name)
+        index = self.get_index()
+        if all(index.get(crypto_type, {}).get(name) == entries.get(crypto_type) for crypto_type in self.crypto_types):
+            return entries
+        self.evict_key(name)
+        def fn(keys):
+            for crypto_type in self.crypto_types:
+                keys.setdefault(crypto_type, {})
+                if crypto_type in entries:
+                    keys[crypto_type][name] = entries[crypto_type]
+                else:
+                    keys[crypto_type].pop(name, None)
+            return keys
+        self.update_index(fn)
+        return entries
+
+    def get_index(self, update:bool=False) -> dict:
+        """
+        the key index {crypto_type: {name: {path, address, crypto_type}}}, served from memory
+        until the key directory or the index file changes
+        """
+        mtime = os.path.getmtime(self.storage_path) if os.path.exists(self.storage_path) else 0
+        index_mtime = os.path.getmtime(self.index_path) if os.path.exists(self.index_path) else 0
+        index = self.key_index.get(self.storage_path)
+        if update or index == None or index['mtime'] != mtime or index['index_mtime'] != index_mtime:
+            index = self.update_index(update=update)
+        return index['keys']
+
+    def update_index(self, fn:callable=None, update:bool=False) -> dict:
+        """
+        applies fn to the index under a file lock and replaces the index atomically,
+        the key directory is rescanned if it changed since the index was written
+        """
+        os.makedirs(self.storage_path, exist_ok=True)
+        with open(self.index_path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.index_path) as f:
+                    index = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                index = None
+            mtime = os.path.getmtime(self.storage_path)
+            changed = update or index == None or index.get('mtime') != mtime
+            if changed:
+                index = {'mtime': mtime, 'keys': self.scan_keys()}
+            if fn != None:
+                index['keys'] = fn(index['keys'])
+                index['mtime'] = os.path.getmtime(self.storage_path)
+                changed = True
+            if changed:
+                tmp_path = f'{self.index_path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(index, f)
+                os.replace(tmp_path, self.index_path)
+            index['index_mtime'] = os.path.getmtime(self.index_path)
+        self.key_index[self.storage_path] = index
+        return index
+
+    def index_key(self, path:str) -> dict:
+        return self.index_keys([path])[0]
+
+    def index_keys(self, paths:List[str]) -> List[dict]:
+        """
+        adds the key files to the index under one lock, the previous key file of a name is removed
+        """
+        entries = []
+        for path in paths:
+            self.evict_key(path.split('/')[-3])
+        def fn(keys):
+            for path in paths:
+                name, crypto_type = path.split('/')[-3], path.split('/')[-2]
+                keys.setdefault(crypto_type, {})
+                old_entry = keys[crypto_type].get(name)
+                if old_entry and old_entry['path'] != path and os.path.exists(old_entry['path']):
+                    os.remove(old_entry['path'])
+                keys[crypto_type][name] = self.index_entry(path) # after the removal so the directory mtime is current
+                entries.append(keys[crypto_type][name])
+            return keys
+        self.update_index(fn)
+        return entries
+
+    def unindex_key(self, name:str, crypto_type=None):
+        crypto_type = self.get_crypto_type(crypto_type)
+        self.evict_key(name)
+        def fn(keys):
+            keys.get(crypto_type, {}).pop(name, None)
+            return keys
+        self.update_index(fn)
+        return {'success': True, 'name': name, 'crypto_type': crypto_type}
+
     def key2path(self, crypto_type=crypto_type) -> dict:
         """
         defines the path for each key
         """
         crypto_type = self.get_crypto_type(crypto_type)
-        key_paths  = c.ls(self.storage_path)
-        key2path = {}
-        for p in key_paths:
-            files = c.glob(f'{p}/{crypto_type}')
-            if len(files) >= 1:
-                file2age = {f:os.path.getmtime(f) for f in files}
-                files = [k for k,v in sorted(file2age.items(), key=lambda item: item[1])]
-                # get the latest file
-                p = files[0]
-                # delete the others
-                for f in files[1:]:
-                    os.remove(f)
-                name = p.split('/')[-3]
-                key2path[name] = p         
-        return key2path
+        return {name: entry['path'] for name, entry in self.get_index().get(crypto_type, {}).items()}
     
     def key2address(self, search=None, crypto_type=None,  **kwargs):
         crypto_type = self.get_crypto_type(crypto_type)
-        key2path = self.key2path(crypto_type=crypto_type)
-        key2address = {}
-        for key, path in key2path.items():
-            key2address[key] = path.split('/')[-1].split('.')[0]
-        return key2address
+        return {name: entry['address'] for name, entry in self.get_index().get(crypto_type, {}).items()}
 
     def key2type(self, search=None, crypto_type=None,  **kwargs):
         crypto_type = self.get_crypto_type(crypto_type)
@@ -277,15 +548,20 @@ class Key:
     
     def key_exists(self, key, crypto_type=None, **kwargs):
         crypto_type = self.get_crypto_type(crypto_type)
-        key2path = self.key2path(crypto_type=crypto_type)
         if f'/{crypto_type}/' in key:
             key = key.split(f'/')[-3]
-        if key in key2path or key in key2path.values():
-            return True
-        return False
+        self.get_key_path(key, crypto_type=crypto_type) # rescans the key directory on a miss
+        key2path = self.key2path(crypto_type=crypto_type)
+        return key in key2path or key in key2path.values()
     
     def get_key_path(self, key, crypto_type=crypto_type):
+        crypto_type = self.get_crypto_type(crypto_type)
         key2path = self.key2path(crypto_type=crypto_type)
+        entry = self.get_index().get(crypto_type, {}).get(key)
+        if (entry == None and key not in key2path.values()) or (entry != None and self.entry_changed(entry)):
+            # the key was added, replaced or removed behind the index (the index only tracks the mtime of the key directory)
+            self.rescan_name(key.split('/')[-3] if f'/{crypto_type}/' in key else key)
+            key2path = self.key2path(crypto_type=crypto_type)
         if key in key2path:
             return key2path[key]
         elif key in key2path.values():
@@ -311,6 +587,7 @@ class Key:
             else:
                 raise Exception(f'key {key} not found, available keys: {keys}')
         c.rm(key2path[key])
+        self.unindex_key(key, crypto_type=crypto_type)
         return {'deleted':[key]}
 
     def is_mnemonic(self, mnemonic:str) -> bool:
@@ -419,15 +696,14 @@ class Key:
         """
         Encodes data for signing and vefiying,  converting it to bytes if necessary.
         """
-        data = c.copy(data)
+        if type(data) is ScaleBytes:
+            return bytes(data.data)
         if not isinstance(data, str):
             data = python2str(data)
-        if type(data) is ScaleBytes:
-            data = bytes(data.data)
-        elif data[0:2] == '0x': # hex string
-            data = bytes.fromhex(data[2:])
+        if data[0:2] == '0x': # hex string
+            return bytes.fromhex(data[2:])
         elif type(data) is str:
-            data = data.encode()
+            return data.encode()
         return data
 
     def resolve_signature(self, signature: Union[bytes, str]):
@@ -441,10 +717,7 @@ class Key:
 
     def resolve_public_key(self, address=None, public_key=None):
         if address != None:
-            if is_valid_ss58_address(address):
-                public_key = ss58_decode(address)
-            else:
-                public_key = address
+            public_key = self.address2public_key(address)
         if public_key == None:
             public_key = self.public_key
         if isinstance(public_key, str) :
@@ -453,6 +726,29 @@ class Key:
             public_key = bytes.fromhex(public_key)
         return public_key
 
+    def address2public_key(self, address:str) -> bytes:
+        """
+        decodes an ss58 or hex address into the public key, the decoded keys are cached across instances
+        """
+        with self.public_key_cache_lock:
+            public_key = self.public_key_cache.get(address)
+            if public_key != None:
+                self.public_key_cache.move_to_end(address)
+                self.public_key_cache_stats['hits'] += 1
+                return public_key
+            self.public_key_cache_stats['misses'] += 1
+        public_key = ss58_decode(address) if is_valid_ss58_address(address) else address
+        if isinstance(public_key, str):
+            public_key = bytes.fromhex(public_key[2:] if public_key.startswith('0x') else public_key)
+        with self.public_key_cache_lock:
+            self.public_key_cache[address] = public_key
+            while len(self.public_key_cache) > self.public_key_cache_size:
+                self.public_key_cache.popitem(last=False)
+        return public_key
+
+    def public_key_cache_info(self) -> dict:
+        return {**self.public_key_cache_stats, 'size': len(self.public_key_cache), 'max_size': self.public_key_cache_size}
+
     def sign(self, data: Union[ScaleBytes, bytes, str], mode='bytes') -> bytes:
         """
         Creates a signature for given data
@@ -513,16 +809,7 @@ class Key:
         data = self.encode_signature_data(data)
         signature = self.resolve_signature(signature)
         public_key = self.resolve_public_key(address=address, public_key=public_key)
-        crypto_type = self.get_crypto_type(crypto_type)
-
-        if crypto_type == "sr25519":
-            crypto_verify_fn = sr25519.verify
-        elif crypto_type == "ed25519":
-            crypto_verify_fn = ed25519_zebra.ed_verify
-        elif crypto_type == "ecdsa":
-            crypto_verify_fn = ecdsa_verify
-        else:
-            raise Exception("Crypto type not supported")
+        crypto_verify_fn = self.get_verify_fn(crypto_type)
         verified = crypto_verify_fn(signature, data, public_key)
         if not verified:
             # Another attempt with the data wrapped, as discussed in https://github.com/polkadot-js/extension/pull/743
@@ -530,6 +817,59 @@ class Key:
             verified = crypto_verify_fn(signature, b'<Bytes>' + data + b'</Bytes>', public_key)
         return verified
 
+    def get_verify_fn(self, crypto_type=None) -> callable:
+        crypto_type = self.get_crypto_type(crypto_type)
+        if crypto_type == "sr25519":
+            return sr25519.verify
+        elif crypto_type == "ed25519":
+            return ed25519_zebra.ed_verify
+        elif crypto_type == "ecdsa":
+            return ecdsa_verify
+        else:
+            raise Exception("Crypto type not supported")
+
+    def verify_batch(self, 
+                     items: list, 
+                     crypto_type = None, 
+                     max_workers:int = None, 
+                     chunk_size:int = 64) -> List[bool]:
+        """
+        Verifies many signatures at once, the results are in the order of the items.
+        The backends have no batch verification and hold the gil, so the items are verified in a loop
+        unless there are enough of a crypto_type (batch_min_items) to pay for a process pool
+        Parameters
+        ----------
+        items: dicts with data, signature and address (or public_key) and optionally crypto_type,
+               or (data, signature, address) tuples
+        crypto_type: the crypto_type of the items that do not define one
+        max_workers: the processes of the pool (the number of cpus by default, 1 verifies in a loop), 
+                     the pool is kept for the next calls so it has the workers of the first call
+        """
+        items = [item if isinstance(item, dict) else dict(zip(['data', 'signature', 'address'], item)) for item in items]
+        crypto_type = self.get_crypto_type(crypto_type)
+        max_workers = max_workers or os.cpu_count() or 1
+        crypto_type2n = {}
+        if max_workers > 1:
+            for item in items:
+                item_crypto_type = self.get_crypto_type(item.get('crypto_type', crypto_type))
+                crypto_type2n[item_crypto_type] = crypto_type2n.get(item_crypto_type, 0) + 1
+        if all(n < self.batch_min_items[k] for k, n in crypto_type2n.items()):
+            return self.verify_chunk(items, crypto_type=crypto_type)
+        chunks = [items[i:i+chunk_size] for i in range(0, len(items), chunk_size)]
+        results = self.map_pool(['verify_chunk'] * len(chunks), chunks, [crypto_type] * len(chunks), max_workers=max_workers)
+        if results == None:
+            return self.verify_chunk(items, crypto_type=crypto_type)
+        return [result for chunk_results in results for result in chunk_results]
+
+    def verify_chunk(self, items: List[dict], crypto_type=None) -> List[bool]:
+        results = []
+        for item in items:
+            try:
+                results.append(bool(self.verify(item['data'], item['signature'], address=item.get('address'), public_key=item.get('public_key'), crypto_type=item.get('crypto_type', crypto_type))))
+            except Exception:
+                results.append(False)
+        return results
+
     def encrypt(self, data, password=None, key=None):
         key = self.get_key(key) if key != None else self
         return key.encryption_key.encrypt(data, password or self.private_key)
@@ -538,18 +878,30 @@ class Key:
         key = self.get_key(key) if key != None else self
         return key.encryption_key.decrypt(data, password or self.private_key)
 
+    def encrypt_file(self, path:str, password=None, key=None, output_path:str = None) -> dict:
+        """
+        encrypts a file in chunks with constant memory (in place if there is no output_path)
+        """
+        key = self.get_key(key) if key != None else self
+        return key.encryption_key.encrypt_file(path, password or self.private_key, output_path=output_path)
+
+    def decrypt_file(self, path:str, password=None, key=None, output_path:str = None) -> dict:
+        key = self.get_key(key) if key != None else self
+        return key.encryption_key.decrypt_file(path, password or self.private_key, output_path=output_path)
+
     def encrypt_key(self, path = 'test.enc', key=None, crypto_type=None,  password=None):
         assert self.key_exists(path), f'file {path} does not exist'
         assert not self.is_key_encrypted(path), f'{path} already encrypted'
         path = self.get_key_path(path)
         data = c.get(path)
         key = self.get_key(key)
-        enc_data = key.encrypt(deepcopy(data), password=password)
+        enc_data = key.encrypt(data, password=password)
         enc_text = {'data': enc_data, 
                     "key_address": data['key_address'],
                     "crypto_type": data['crypto_type'],
                     'encrypted': True}
         c.put(path, enc_text)
+        self.evict_key(path)
         return {'number_of_characters_encrypted':len(enc_text), 'path':path }
     
     def is_key_encrypted(self, key, data=None, crypto_type=None):
@@ -566,6 +918,7 @@ class Key:
         key = self.get_key(key, crypto_type=crypto_type)
         dec_text =  key.decrypt(data['data'], password=password)
         c.put(path, dec_text)
+        self.evict_key(path)
         assert not self.is_key_encrypted(path), f'failed to decrypt {path}'
         loaded_key = self.get_key(path)
         return { 'path':path , 'key_address': loaded_key.ss58_address,'crypto_type': loaded_key.crypto_type}
@@ -638,3 +991,12 @@ class Key:
 
     def str2key(self, password:str, crypto_type=None, **kwargs):
         return self.from_password(password, crypto_type=crypto_type, **kwargs)
+
+
+def call_pool_key(fn:str, *args):
+    """
+    calls a method of the key of the pool worker, so the keys of the caller are never sent to the workers
+    """
+    if Key.pool_key == None:
+        Key.pool_key = Key()
+    return getattr(Key.pool_key, fn)(*args)
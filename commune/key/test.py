@@ -1,3 +1,6 @@
+import os
+import json
+import shutil
 import commune as c
 
 Key = c.module('key')
@@ -121,4 +124,134 @@ class Test:
         assert og_key.ss58_address == new_key.ss58_address
         key.rm_key('testto')
         assert not key.key_exists('testto')
-        return {'success':True, 'msg':'test_move_key passed', 'key':new_key.ss58_address}
\ No newline at end of file
+        return {'success':True, 'msg':'test_move_key passed', 'key':new_key.ss58_address}
+    def test_key_index(self, path='test.index'):
+        key = Key()
+        if key.key_exists(path):
+            key.rm_key(path)
+        new_key = key.add_key(path)
+        index = c.get(key.index_path)
+        assert index['keys'][new_key.crypto_type][path]['address'] == new_key.ss58_address, f'{path} not indexed'
+        assert key.key2address()[path] == new_key.ss58_address
+        # a key file replaced behind the index (in its nested directory) is picked up on lookup
+        old_path = key.get_key_path(path)
+        other_key = key.add_key(path + '.other')
+        new_path = os.path.dirname(old_path) + '/' + other_key.ss58_address + '.json'
+        shutil.copy(key.get_key_path(path + '.other'), new_path)
+        assert key.get_key_path(path) == new_path, 'stale index'
+        # a missing name only rescans its own directory and does not rewrite the index
+        index_mtime = os.path.getmtime(key.index_path)
+        assert not key.key_exists(path + '.missing')
+        assert os.path.getmtime(key.index_path) == index_mtime, 'the index was rewritten for a missing key'
+        os.remove(old_path)
+        key.rm_key(path + '.other')
+        key.rm_key(path)
+        assert path not in c.get(key.index_path)['keys'][new_key.crypto_type], f'{path} still indexed'
+        assert not key.key_exists(path)
+        return {'success': True, 'msg': 'test_key_index passed'}
+
+    def test_key_cache(self, path='test.cache'):
+        key = Key()
+        key.add_key(path, refresh=True)
+        k1 = key.get_key(path)
+        assert key.get_key(path) is k1, 'key not cached'
+        assert key.get_key(path, cache=False) is not k1
+        key.add_key(path, refresh=True)
+        k2 = key.get_key(path)
+        assert k2.ss58_address != k1.ss58_address, 'rotated key served from the cache'
+        key.rm_key(path)
+        assert key.evict_key(path) == 0, 'removed key still cached'
+        return {'success': True, 'msg': 'test_key_cache passed'}
+
+    def test_verify_batch(self, n=10, crypto_type=['sr25519', 'ecdsa']):
+        items = []
+        for k in crypto_type:
+            key = Key(crypto_type=k)
+            for i in range(n):
+                data = {'i': i, 'crypto_type': key.crypto_type}
+                items.append({'data': data, 'signature': key.sign(data, mode='str'), 'address': key.key_address, 'crypto_type': key.crypto_type})
+        items[0]['data'] = {'i': -1} # tampered
+        expected = [False] + [True] * (len(items) - 1)
+        key = Key()
+        assert key.verify_batch(items, max_workers=1) == expected, 'batch verification failed in a loop'
+        key.batch_min_items = {k: 1 for k in key.crypto_types} # forces the process pool
+        results = key.verify_batch(items, max_workers=2, chunk_size=3)
+        assert results == expected, f'batch verification failed in the pool {results}'
+        # daemonic processes (the server workers) cannot have a pool so they verify in a loop
+        import multiprocessing
+        queue = multiprocessing.get_context('fork').Queue()
+        process = multiprocessing.get_context('fork').Process(target=lambda: queue.put(key.verify_batch(items, max_workers=2)), daemon=True)
+        process.start()
+        assert queue.get(timeout=60) == expected, 'batch verification failed in a daemonic process'
+        process.join()
+        queue.close()
+        return {'success': True, 'msg': 'test_verify_batch passed', 'n': len(items)}
+
+    def test_signature_encoding(self):
+        key = Key()
+        data = {'a': [1, 2, {'b': 'c'}], 'fn': 'info'}
+        data_copy = c.copy(data)
+        encoded = key.encode_signature_data(data)
+        assert encoded == json.dumps(data_copy).encode(), 'signature encoding changed'
+        assert data == data_copy, 'input mutated'
+        assert key.encode_signature_data('0xabcd') == bytes.fromhex('abcd')
+        assert key.encode_signature_data({1, 3, 2}) == b'[1, 2, 3]', 'sets should be sorted'
+        from commune.utils import python2str, python2str_cache
+        payload = b'x' * 1000000
+        python2str(payload)
+        assert id(payload) not in python2str_cache, 'large payloads should not be kept by the cache'
+        assert python2str(b'ab') == python2str(b'ab') == '6162'
+        import numpy as np
+        assert python2str({'a': np.arange(3), 'b': b'ab', 'c': [np.float32(1.5)]}) == '{"a": [0, 1, 2], "b": "6162", "c": [1.5]}'
+        assert python2str(data) == json.dumps(data), 'the json of json values changed'
+        return {'success': True, 'msg': 'test_signature_encoding passed'}
+
+    def test_public_key_cache(self):
+        key = Key()
+        info = key.public_key_cache_info()
+        assert key.resolve_public_key(address=key.key_address) == key.public_key
+        assert key.resolve_public_key(address=key.key_address) == key.public_key
+        new_info = key.public_key_cache_info()
+        assert new_info['hits'] >= info['hits'] + 1, f'public key not cached {new_info}'
+        return {'success': True, 'msg': 'test_public_key_cache passed', **new_info}
+
+    def test_file_encryption(self, path='~/.commune/key_test/file.bin', size=3000000):
+        import os
+        key = Key()
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = os.urandom(size)
+        with open(path, 'wb') as f:
+            f.write(data)
+        key.encrypt_file(path)
+        assert open(path, 'rb').read() != data, 'file not encrypted'
+        key.decrypt_file(path)
+        assert open(path, 'rb').read() == data, 'file decryption failed'
+        os.remove(path)
+        return {'success': True, 'msg': 'test_file_encryption passed'}
+
+    def test_add_keys(self, prefix='test.bulk::', n=4):
+        key = Key()
+        names = [f'{prefix}{i}' for i in range(n)]
+        for name in names:
+            if key.key_exists(name):
+                key.rm_key(name)
+        name2address = key.add_keys(names, max_workers=2)
+        assert sorted(name2address) == sorted(names), f'missing keys {name2address}'
+        for name in names:
+            assert key.get_key(name).ss58_address == name2address[name]
+            key.rm_key(name)
+        assert key.add_keys([]) == {}
+        return {'success': True, 'msg': 'test_add_keys passed', 'n': n}
+
+    def test_derive_many(self, n=10):
+        from commune.key.utils import derive_many, mnemonic_to_ecdsa_private_key, bip32_cache
+        mnemonic = Key().generate_mnemonic()
+        paths = [f"m/44'/60'/0'/0/{i}" for i in range(n)]
+        private_keys = derive_many(mnemonic, paths)
+        assert len(bip32_cache) > 0
+        Key().evict_key()
+        assert len(bip32_cache) == 0, 'evict_key kept the bip32 nodes'
+        assert private_keys == [mnemonic_to_ecdsa_private_key(mnemonic, p) for p in paths], 'cached derivation differs'
+        assert len(set(private_keys)) == n
+        return {'success': True, 'msg': 'test_derive_many passed', 'n': n}
@@ -26,6 +26,8 @@ from scalecodec.types import Bytes
 import hashlib
 import hmac
 import struct
+import threading
+from collections import OrderedDict
 from eth_keys.datatypes import Signature, PrivateKey
 from eth_utils import to_checksum_address, keccak as eth_utils_keccak
 from ecdsa.curves import SECP256k1
@@ -126,19 +128,63 @@ def parse_derivation_path(str_derivation_path):
     return path
 
 
+BIP32_CACHE_SIZE = 4096
+bip32_cache = OrderedDict() # (seed hash, path prefix) -> (private_key, chain_code), least recently used first
+bip32_cache_lock = threading.Lock()
+
+def clear_bip32_cache() -> int:
+    """
+    drops the memoized bip32 nodes, they hold the master private key and chain code of every seed
+    """
+    with bip32_cache_lock:
+        n = len(bip32_cache)
+        bip32_cache.clear()
+    return n
+
+def derive_bip32node(mnemonic: str, derivation_path: list, passphrase: str = "") -> tuple:
+    """
+    derives the (private_key, chain_code) of the path, the seed stretch and the nodes on the path
+    are memoized so sibling paths only derive from their closest cached parent
+    """
+    seed_hash = hashlib.sha256(f'{mnemonic}\x00{passphrase}'.encode()).digest()
+    path = tuple(derivation_path)
+    node, depth = None, 0
+    with bip32_cache_lock:
+        for depth in range(len(path), -1, -1):
+            if (seed_hash, path[:depth]) in bip32_cache:
+                node = bip32_cache[(seed_hash, path[:depth])]
+                bip32_cache.move_to_end((seed_hash, path[:depth]))
+                break
+    nodes = {}
+    if node is None:
+        node, depth = bip39seed_to_bip32masternode(mnemonic_to_bip39seed(mnemonic, passphrase)), 0
+        nodes[path[:0]] = node
+    for i in range(depth, len(path)):
+        node = derive_bip32childkey(node[0], node[1], path[i])
+        nodes[path[:i+1]] = node
+    with bip32_cache_lock:
+        for prefix, prefix_node in nodes.items():
+            bip32_cache[(seed_hash, prefix)] = prefix_node
+        while len(bip32_cache) > BIP32_CACHE_SIZE:
+            bip32_cache.popitem(last=False)
+    return node
+
 def mnemonic_to_ecdsa_private_key(mnemonic: str, str_derivation_path: str = None, passphrase: str = "") -> bytes:
 
     if str_derivation_path is None:
         str_derivation_path = f'{ETH_DERIVATION_PATH}/0'
 
     derivation_path = parse_derivation_path(str_derivation_path)
-    bip39seed = mnemonic_to_bip39seed(mnemonic, passphrase)
-    master_private_key, master_chain_code = bip39seed_to_bip32masternode(bip39seed)
-    private_key, chain_code = master_private_key, master_chain_code
-    for i in derivation_path:
-        private_key, chain_code = derive_bip32childkey(private_key, chain_code, i)
+    private_key, chain_code = derive_bip32node(mnemonic, derivation_path, passphrase=passphrase)
     return private_key
 
+def derive_many(mnemonic: str, str_derivation_paths: list, passphrase: str = "") -> list:
+    """
+    derives the ecdsa private keys of many paths of one mnemonic, the seed is stretched once
+    and the paths share their parent nodes (e.g. m/44'/60'/0'/0/{i})
+    """
+    return [mnemonic_to_ecdsa_private_key(mnemonic, p, passphrase=passphrase) for p in str_derivation_paths]
+
 
 def ecdsa_sign(private_key: bytes, message: bytes) -> bytes:
     signer = PrivateKey(private_key)
@@ -271,24 +317,6 @@ def encode_pair(public_key: bytes, private_key: bytes, passphrase: str) -> bytes
 
 
 
-def python2str(x):
-    from copy import deepcopy
-    import json
-    x = deepcopy(x)
-    input_type = type(x)
-    if input_type == str:
-        return x
-    if input_type in [dict]:
-        x = json.dumps(x)
-    elif input_type in [bytes]:
-        x = bytes2str(x)
-    elif input_type in [list, tuple, set]:
-        x = json.dumps(list(x))
-    elif input_type in [int, float, bool]:
-        x = str(x)
-        
-    return x
-
 class DeriveJunction:
     def __init__(self, chain_code, is_hard=False):
         self.chain_code = chain_code
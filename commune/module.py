@@ -1,23 +1,51 @@
 
 import os
+import ast
 import inspect
 import json
-import yaml
 import shutil
 import time
 import sys
 import argparse
+import threading
+import linecache
+import weakref
 from functools import partial
 import os
 from copy import deepcopy
 from typing import *
-import nest_asyncio
-nest_asyncio.apply()
 
 class Module:
+    file_index = None # path -> {mtime, size, classes} of the python files in the trees
+    file_index_changed = False
+    watcher = None # the watcher of the trees (see watch)
+    trees = {} # root -> {depth, path2classes, tree} of the watched trees
+    module_cache = {} # normalized name -> {path, obj} or {error} of the resolved modules, shared by the instances
+    module_cache_stats = {'hits': 0, 'misses': 0}
+    module_cache_lock = threading.Lock()
+    module_cache_ttl = 60 # (in seconds) how long a failed module is not retried
+    lazy = False # the globals are resolved on first use and the modules are not synced with git (see lazy_globals)
+    route_map = {} # fn -> module/fn of the routes, bound on first use (see __getattr__)
+    route_map_key = None # the mtimes of the files the routes were read from
+    nested_asyncio = False
+    fn_index_cache = weakref.WeakKeyDictionary() # class (or python module) -> {mtime, fns} of the functions it defines (see fn_index)
+    fn_index_lock = threading.Lock()
+    line_index = {} # path -> {mtime, ends} with the last line of every function in the file by its first line
+
+    def __init__(self, globals_input = None, lazy=False, **kwargs): 
+        if lazy:
+            self.lazy_globals(globals_input)
+        else:
+            self.sync(globals_input=globals_input, **kwargs)
 
-    def __init__(self, globals_input = None, **kwargs): 
-        self.sync(globals_input=globals_input, **kwargs)
+    def __getattr__(self, name:str):
+        # only called when the attribute is missing, so the functions and attributes take precedence over the routes
+        route = Module.route_map.get(name)
+        if route == None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        fn = self.route_fn(route, name)
+        setattr(self, name, fn)
+        return fn
 
     def module(self, 
                 path: str = 'module', 
@@ -25,31 +53,57 @@ class Module:
                 cache=True, 
                 verbose=False, 
                 **kwargs) -> str:
-        # Initialize cache if needed
-        
-
-        path = path or 'module'
-
-        if cache:
-            if not hasattr(Module, 'module_cache'):
-                self.module_cache = {}
-            else:
-                if path in self.module_cache:
-                    print(f'ModuleCache({path})') if verbose else None
-                    return self.module_cache[path]
-
         # Return path if it's already a module object
         if not isinstance(path, str) and path is not None:
             return path
-
+        path = path or 'module'
         if path in ['module']:
             return Module
-            
-        t0 = time.time()
         # Normalize path
-        path = path.replace('/', '.')
-        path = self.shortcuts.get(path, path)
-        module = self.tree().get(path, path)
+        name = path.replace('/', '.')
+        name = self.shortcuts.get(name, name)
+        entry = self.module_cache.get(name) if cache else None
+        if entry != None and 'error' in entry and time.time() - entry['time'] > self.module_cache_ttl:
+            entry = None # retry the failed module
+        with self.module_cache_lock:
+            self.module_cache_stats['hits' if entry != None else 'misses'] += 1
+        if entry != None:
+            print(f'ModuleCache({name})') if verbose else None
+            if 'error' in entry:
+                # a new exception so the traceback of the cached one does not grow with every raise
+                error_type, message = entry['error']
+                try:
+                    error = error_type(message)
+                except Exception:
+                    error = ModuleNotFoundError(f'{name}: {message}')
+                raise error from None
+            obj = entry['obj']
+        else:
+            try:
+                obj, object_path = self.load_module(name, verbose=verbose)
+            except Exception as e:
+                if cache:
+                    with self.module_cache_lock:
+                        self.module_cache[name] = {'error': (type(e), str(e)), 'time': time.time()}
+                raise e
+            if cache:
+                with self.module_cache_lock:
+                    self.module_cache[name] = {'path': object_path, 'obj': obj, 'time': time.time()}
+        # Apply parameters if provided
+        if isinstance(params, dict):
+            obj = obj(**params)
+        elif isinstance(params, list):
+            obj = obj(*params)
+        else: 
+            # no params set
+            pass
+        return obj
+
+    def load_module(self, name:str, verbose=False) -> tuple:
+        """
+        resolves the name through the tree and imports it, returns the (object, object path)
+        """
+        module = self.tree().get(name, name)
         # Try to load the module
         try:
             obj = self.obj(module)
@@ -64,17 +118,22 @@ class Module:
                     print(f'Found {module} in {tree_keys}')
                     module = tree.get(tree_keys[0])
             obj = self.obj(module)
-        # Apply parameters if provided
-        if isinstance(params, dict):
-            obj = obj(**params)
-        elif isinstance(params, list):
-            obj = obj(*params)
-        else: 
-            # no params set
-            pass
-        if cache: 
-            self.module_cache[path] = obj
-        return obj
+        return obj, module
+
+    def module_cache_info(self) -> dict:
+        errors = [k for k,v in self.module_cache.items() if 'error' in v]
+        return {**self.module_cache_stats, 'size': len(self.module_cache), 'errors': errors}
+
+    def clear_module_cache(self, errors_only:bool = False) -> dict:
+        """
+        clears the resolved modules (only the failed ones if errors_only)
+        """
+        with self.module_cache_lock:
+            names = [k for k,v in self.module_cache.items() if not errors_only or 'error' in v]
+            for k in names:
+                self.module_cache.pop(k, None)
+        return {'success': True, 'cleared': len(names)}
+
     get_agent = block =  get_block = get_module =  mod =  module
 
     def go(self, module=None, **kwargs):
@@ -374,6 +433,7 @@ class Module:
             if filetype == 'json':
                 config = json.load(open(path, 'r'))
             elif filetype in ['yaml', 'yml']:
+                import yaml
                 config = yaml.load(open(path, 'r'), Loader=yaml.FullLoader)
             else:
                 raise Exception(f'Invalid config file {path}')
@@ -618,11 +678,11 @@ class Module:
 
     def fn2code(self, module=None)-> Dict[str, str]:
         module = self.resolve_module(module)
-        functions = self.fns(module)
+        fn_index = self.fn_index(module)
         fn_code_map = {}
-        for fn in functions:
+        for fn in self.fns(module):
             try:
-                fn_code_map[fn] = self.code(getattr(module, fn))
+                fn_code_map[fn] = self.lines2code(**fn_index[fn]) if fn_index[fn]['end'] != None else self.code(getattr(module, fn))
             except Exception as e:
                 self.print(f'Error {e} {fn}', color='red')
         return fn_code_map
@@ -643,6 +703,9 @@ class Module:
         Is this shiz a generator dawg?
         """
         if isinstance(obj, str):
+            fn_info = self.fn_index(type(self)).get(obj)
+            if fn_info != None and fn_info['type'] != 'property':
+                return fn_info['generator']
             if not hasattr(self, obj):
                 return False
             obj = getattr(self, obj)
@@ -685,16 +748,70 @@ class Module:
         """
         if isinstance(obj, str):
             obj = self.fn(obj)
-        sourcelines = inspect.getsourcelines(obj)
-        source = ''.join(sourcelines[0])
+        lines = self.fn_lines(obj)
+        if lines != None and lines['end'] != None:
+            path, start = lines['path'], lines['start']
+            source = self.lines2code(**lines)
+            length = lines['end'] - start + 1
+        else:
+            sourcelines, start = inspect.getsourcelines(obj)
+            path, source, length = inspect.getfile(obj), ''.join(sourcelines), len(sourcelines)
         return {
-                             'start': sourcelines[1], 
-                             'length': len(sourcelines[0]),
-                             'path': inspect.getfile(obj).replace(self.home_path, '~'),
+                             'start': start, 
+                             'length': length,
+                             'path': path.replace(self.home_path, '~'),
                              'code': source if include_code else None,
                              'hash': self.hash(source),
-                             'end': len(sourcelines[0]) + sourcelines[1]
+                             'end': length + start
                              }
+
+    def fn_lines(self, fn) -> dict:
+        """
+        the path and the lines (start with the decorators, end) of a function from its code and the ast of its file,
+        the end is None if the file is not available (compiled or dynamically created functions)
+        """
+        fn = getattr(fn, 'fget', fn) # property
+        fn = inspect.unwrap(getattr(fn, '__func__', fn)) # method, staticmethod or classmethod
+        code = getattr(fn, '__code__', None)
+        if code == None:
+            return None
+        path, start = code.co_filename, code.co_firstlineno
+        return {'path': path, 'start': start, 'end': self.line_ends(path).get(start)}
+
+    def line_ends(self, path:str) -> Dict[int, int]:
+        """
+        the last line of every function in the file by its first line, the file is parsed again when it changes
+        """
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {}
+        entry = self.line_index.get(path)
+        if entry == None or entry['mtime'] != mtime:
+            ends = {}
+            try:
+                with open(path) as f:
+                    lines = f.read().split('\n')
+                nodes = ast.walk(ast.parse('\n'.join(lines)))
+            except (OSError, SyntaxError, ValueError):
+                nodes = []
+            for node in nodes:
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    end = node.end_lineno
+                    # like inspect.getsource, the comments indented as the body after its last line are included
+                    for i in range(end, len(lines)):
+                        line = lines[i].strip()
+                        if line.startswith('#') and len(lines[i]) - len(lines[i].lstrip()) >= node.body[0].col_offset:
+                            end = i + 1
+                        elif line:
+                            break
+                    ends[min([d.lineno for d in node.decorator_list] + [node.lineno])] = end
+            entry = self.line_index[path] = {'mtime': mtime, 'ends': ends}
+        return entry['ends']
+
+    def lines2code(self, path:str, start:int, end:int, **kwargs) -> str:
+        linecache.checkcache(path)
+        return ''.join(linecache.getlines(path)[start-1:end])
     
     def schema(self, obj = None, **kwargs)->dict:
         '''
@@ -781,22 +898,14 @@ class Module:
                       include_children = False,
                       **kwargs) -> List[str]:
         '''
-        Get a list of functions in a class (in text parsing)
+        Get a list of functions in a class (from the function index)
         Args;
             obj: the class to get the functions from
             include_parents: whether to include the parent functions
             include_hidden:  whether to include hidden functions (starts and begins with "__")
         '''
         obj = self.resolve_module(obj)
-        text = inspect.getsource(obj)
-        functions = []
-        for splitter in ["   def " , "    def "]:
-            for line in text.split('\n'):
-                if f'"{splitter}"' in line: # removing edge case
-                    continue
-                if line.startswith(splitter):
-                    functions += [line.split(splitter)[1].split('(')[0].strip()]
-        functions = sorted(list(set(functions)))
+        functions = sorted(self.fn_index(obj))
         if search != None:
             functions = [f for f in functions if search in f]
         if not include_hidden: 
@@ -804,6 +913,50 @@ class Module:
         return functions
         
     
+    def fn_index(self, obj: Any = None, update:bool = False) -> Dict[str, dict]:
+        '''
+        the functions defined by a class (or a python module) -> {name, type, async, generator, signature, args, path, start, end}
+        read from the functions and the ast of the file instead of the source text, so it also works for compiled or dynamically created classes,
+        the index is rebuilt when the file of the class changes
+        '''
+        obj = self.resolve_module(obj)
+        if not isinstance(obj, (type, type(sys))):
+            obj = type(obj)
+        is_module = isinstance(obj, type(sys))
+        path = getattr(obj if is_module else sys.modules.get(obj.__module__), '__file__', None)
+        try:
+            mtime = os.path.getmtime(path)
+        except (OSError, TypeError):
+            mtime = None
+        entry = self.fn_index_cache.get(obj)
+        if entry != None and entry['mtime'] == mtime and not update:
+            return entry['fns']
+        fns = {}
+        for name, value in list(vars(obj).items()):
+            fn_type = 'function' if is_module else 'method'
+            fn = value
+            if isinstance(value, property):
+                fn_type, fn = 'property', value.fget
+            elif isinstance(value, (staticmethod, classmethod)):
+                fn_type, fn = type(value).__name__, value.__func__
+            # the aliases (get_module = module) and the imported functions are not defined here
+            if not inspect.isfunction(fn) or fn.__name__ != name or (is_module and fn.__module__ != obj.__name__):
+                continue
+            try:
+                signature = inspect.signature(fn)
+            except (TypeError, ValueError):
+                signature = None
+            fns[name] = {'name': name,
+                         'type': fn_type,
+                         'async': inspect.iscoroutinefunction(fn) or inspect.isasyncgenfunction(fn),
+                         'generator': inspect.isgeneratorfunction(fn),
+                         'signature': str(signature) if signature != None else None,
+                         'args': list(signature.parameters) if signature != None else [],
+                         **self.fn_lines(fn)}
+        with self.fn_index_lock:
+            self.fn_index_cache[obj] = {'mtime': mtime, 'fns': fns}
+        return fns
+
     def clear_info_history(self):
         return self.rm('info')
 
@@ -1013,17 +1166,8 @@ class Module:
                 except Exception as e:
                     pass
         elif os.path.isfile(path) and path.endswith('.py'):
-            code = self.get_text(path)
-            classes = []
+            classes = self.file2classes(path)
             file_path = self.path2objectpath(path)
-            for line in code.split('\n'):
-                if line.startswith(class_prefix) and line.strip().endswith(class_suffix):
-                    new_class = line.split(class_prefix)[-1].split('(')[0].strip()
-                    if new_class.endswith(class_suffix):
-                        new_class = new_class[:-1]
-                    if ' ' in new_class:
-                        continue
-                    classes += [new_class]
             if file_path.startswith(path):
                 file_path = file_path[len(path)+1:]
             if '/' in file_path:
@@ -1039,6 +1183,51 @@ class Module:
    
         return path2classes
 
+    def file2classes(self, path:str) -> List[str]:
+        """
+        the top level classes of a python file, parsed once and indexed by the mtime and size of the file
+        """
+        if Module.file_index == None:
+            Module.file_index = self.get('tree/file_index', {})
+        stat = os.stat(path)
+        entry = Module.file_index.get(path)
+        if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            return entry['classes']
+        code = self.get_text(path)
+        try:
+            classes = [node.name for node in ast.parse(code).body if isinstance(node, ast.ClassDef)]
+        except (SyntaxError, ValueError):
+            classes = self.text2classes(code)
+        Module.file_index[path] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'classes': classes}
+        Module.file_index_changed = True
+        return classes
+
+    def text2classes(self, code:str, class_prefix = 'class ', class_suffix = ':') -> List[str]:
+        """
+        scans the lines of the code for classes (for files that do not parse)
+        """
+        classes = []
+        for line in code.split('\n'):
+            if line.startswith(class_prefix) and line.strip().endswith(class_suffix):
+                new_class = line.split(class_prefix)[-1].split('(')[0].strip()
+                if new_class.endswith(class_suffix):
+                    new_class = new_class[:-1]
+                if ' ' in new_class:
+                    continue
+                classes += [new_class]
+        return classes
+
+    def save_file_index(self) -> dict:
+        """
+        persists the file index, the files that no longer exist are dropped
+        """
+        if Module.file_index == None or not Module.file_index_changed:
+            return {'success': True, 'changed': False}
+        Module.file_index = {k:v for k,v in Module.file_index.items() if os.path.exists(k)}
+        self.put('tree/file_index', Module.file_index)
+        Module.file_index_changed = False
+        return {'success': True, 'changed': True, 'files': len(Module.file_index)}
+
     def path2fns(self, path = './', tolist=False, **kwargs):
         fns = []
         path = os.path.abspath(path)
@@ -1146,14 +1335,79 @@ class Module:
     def local_tree(self , depth=4, **kwargs):
         return self.get_tree(os.getcwd(), depth=depth, **kwargs)
     
+    def watch(self, paths:List[str] = None, mode:str = 'auto', interval:float = 1) -> dict:
+        """
+        watches the files of the trees (inotify with a polling fallback) and updates the trees on change,
+        so get_tree serves them from memory instead of rebuilding them when max_age expires
+        """
+        if not self.watching():
+            from commune.watcher import Watcher
+            paths = paths or [self.core_path, self.modules_path, os.getcwd()]
+            Module.trees = {}
+            Module.watcher = Watcher(paths, callback=self.on_change, mode=mode, interval=interval).start()
+        return {'success': True, 'mode': Module.watcher.mode, 'paths': Module.watcher.paths}
+
+    def unwatch(self) -> dict:
+        if Module.watcher != None:
+            Module.watcher.stop()
+        Module.watcher = None
+        Module.trees = {}
+        return {'success': True}
+
+    def watching(self, path:str = None) -> bool:
+        """
+        whether the watcher runs in this process (and watches the path)
+        """
+        if Module.watcher == None or not Module.watcher.alive():
+            return False
+        if path != None:
+            path = os.path.abspath(path)
+            return any(path == p or path.startswith(p + '/') for p in Module.watcher.paths)
+        return True
+
+    def on_change(self, path:str, is_dir:bool = False):
+        """
+        updates the classes of a changed file in the watched trees, a created or removed
+        directory drops the tree instead (it is rebuilt from the file index on the next get_tree)
+        """
+        if Module.file_index != None:
+            Module.file_index.pop(path, None)
+        self.clear_module_cache(errors_only=True) # a missing module may exist now
+        for root, tree in list(Module.trees.items()):
+            if not path.startswith(root + '/'):
+                continue
+            if is_dir:
+                Module.trees.pop(root, None)
+                continue
+            path2classes = {k:v for k,v in tree['path2classes'].items() if k != path}
+            if os.path.exists(path) and path[len(root)+1:].count('/') < tree['depth']:
+                path2classes.update({k:v for k,v in self.path2classes(path).items() if len(v) > 0})
+            # the tree is replaced and not mutated so readers never see a partial update
+            Module.trees[root] = {'depth': tree['depth'], 'path2classes': path2classes, 'tree': None}
+
+    def watched_tree(self, path:str, depth:int = 10, update:bool = False) -> dict:
+        root = os.path.abspath(path)
+        tree = Module.trees.get(root)
+        if update or tree == None or tree['depth'] != depth:
+            tree = {'depth': depth, 'path2classes': self.path2classes(root, depth=depth), 'tree': None}
+            Module.trees[root] = tree
+            self.save_file_index()
+        if tree['tree'] == None:
+            class_paths = [p for _, v in sorted(tree['path2classes'].items()) for p in v]
+            tree['tree'] = dict(zip([self.objectpath2name(p) for p in class_paths], class_paths))
+        return tree['tree']
+
     def get_tree(self, path, depth = 10, max_age=60, update=False, **kwargs):
+        if self.watching(path):
+            return self.watched_tree(path, depth=depth, update=update)
         tree_cache_path = 'tree/'+os.path.abspath(path).replace('/', '_')
         tree = self.get(tree_cache_path, None, max_age=max_age, update=update)
         if tree == None:
-            class_paths = self.classes(path, depth=depth)
+            class_paths = self.classes(path, depth=depth) # only the changed files are parsed again
             simple_paths = [self.objectpath2name(p) for p in class_paths]
             tree = dict(zip(simple_paths, class_paths))
             self.put(tree_cache_path, tree)
+            self.save_file_index()
         return tree
     
     def tree(self, search=None,  max_age=60,update=False, **kwargs):
@@ -1175,10 +1429,13 @@ class Module:
         return list(self.tree(search=search, **kwargs).keys())
 
     def modules(self, search=None, cache=True, max_age=60, update=False, **extra_kwargs)-> List[str]:
-        modules = self.get('modules', max_age=max_age, update=update)
-        if not cache or modules == None:
-            modules =  self.get_modules(search=None, **extra_kwargs)
-            self.put('modules', modules)
+        if self.watching():
+            modules = self.get_modules(search=None, update=update, **extra_kwargs) # the live trees, kept fresh by the watcher
+        else:
+            modules = self.get('modules', max_age=max_age, update=update)
+            if not cache or modules == None:
+                modules =  self.get_modules(search=None, **extra_kwargs)
+                self.put('modules', modules)
         if search != None:
             modules = [m for m in modules if search in m]     
         return modules
@@ -1215,6 +1472,7 @@ class Module:
         if not os.path.exists(dirpath):
             os.makedirs(dirpath, exist_ok=True)
         self.put_text(path, 'import commune as c \n'+code)
+        self.clear_module_cache(errors_only=True)
         return {'name': name, 'path': path, 'msg': 'Module Created'}
     
     add_module = new_module = new
@@ -1352,12 +1610,40 @@ class Module:
 
         """
         This ties other modules into the current module.
-        The way it works is that it takes the module name and the function name and creates a partial function that is bound to the module.
-        This allows you to call the function as if it were a method of the current module.
-        for example
+        The way it works is that it maps the function name to the module and the function name (module/fn),
+        the function is bound to the module on first use (see __getattr__) so you can call it as if it were a method of the current module.
+        The map is rebuilt only when the config or the utils change.
         """
-        routes = self.routes()
         t0 = time.time()
+        paths = [self.lib_path + f'/config.{m}' for m in ['json', 'yaml']] + [self.core_path + '/utils.py']
+        key = [os.path.getmtime(p) if os.path.exists(p) else None for p in paths]
+        if key == Module.route_map_key:
+            return {'success': True, 'msg': 'routes are synced', 'duration': time.time() - t0}
+        routes = self.routes()
+        route_map = {}
+        for module, fns in routes.items():
+            for fn in fns: 
+                if isinstance(fn, list):
+                    to_fn = fn[1]
+                    fn = fn[0]
+                if isinstance(fn, dict):
+                    to_fn = fn['to']
+                    fn = fn['from']
+                if isinstance(fn, str):
+                    to_fn = fn
+                if hasattr(Module, to_fn) or to_fn in route_map:
+                    if verbose:
+                        print(f'Warning: {to_fn} already exists')
+                else:
+                    route_map[to_fn] = f'{module}/{fn}'
+        Module.route_map, Module.route_map_key = route_map, key
+        duration = time.time() - t0
+        return {'success': True, 'msg': 'enabled routes', 'duration': duration}
+
+    def route_fn(self, route:str, name:str = None) -> Callable:
+        """
+        the function of the route (module/fn), the module is only resolved when the function is called
+        """
         # WARNING : THE PLACE HOLDERS MUST NOT INTERFERE WITH THE KWARGS OTHERWISE IT WILL CAUSE A BUG IF THE KWARGS ARE THE SAME AS THE PLACEHOLDERS
         # THE PLACEHOLDERS ARE NAMED AS module_ph and fn_ph AND WILL UNLIKELY INTERFERE WITH THE KWARGS
         def fn_generator(*args, route, **kwargs):
@@ -1380,25 +1666,9 @@ class Module:
                     return fn_obj
             return fn_wrapper(*args, **kwargs)
 
-        for module, fns in routes.items():
-            for fn in fns: 
-                if isinstance(fn, list):
-                    to_fn = fn[1]
-                    fn = fn[0]
-                if isinstance(fn, dict):
-                    to_fn = fn['to']
-                    fn = fn['from']
-                if isinstance(fn, str):
-                    to_fn = fn
-                if hasattr(self, to_fn):
-                    if verbose:
-                        print(f'Warning: {to_fn} already exists')
-                else:
-                    fn_obj = partial(fn_generator, route=f'{module}/{fn}') 
-                    fn_obj.__name__ = to_fn
-                    setattr(self, to_fn, fn_obj)
-        duration = time.time() - t0
-        return {'success': True, 'msg': 'enabled routes', 'duration': duration}
+        fn_obj = partial(fn_generator, route=route)
+        fn_obj.__name__ = name or route.split('/')[-1]
+        return fn_obj
 
     def giturl(self, url:str='commune-ai/commune'):
         gitprefix = 'https://github.com/'
@@ -1520,15 +1790,51 @@ class Module:
         """
         add the functions and classes of the module to the global namespace
         """
-        from functools import partial
         globals_input = globals_input or {}
+        for k,v in Module.route_map.items():
+            globals_input[k] = self.route_fn(v, k)
         for k,v in self.__dict__.items():
             globals_input[k] = v     
         for f in self.fns(Module, mode='self'):
-            def wrapper_fn(f, *args, **kwargs):
-                fn = getattr(Module(), f)
-                return fn(*args, **kwargs)
-            globals_input[f] = partial(wrapper_fn, f)
+            globals_input[f] = self.global_fn(f)
+        return globals_input
+
+    def global_fn(self, fn:str) -> Callable:
+        """
+        the global of a function of the module, it is called on a new module
+        """
+        def wrapper_fn(f, *args, **kwargs):
+            fn = getattr(Module(), f)
+            return fn(*args, **kwargs)
+        return partial(wrapper_fn, fn)
+
+    def lazy_globals(self, globals_input:dict = None) -> dict:
+        """
+        resolves the globals on first use (c.<name>) instead of syncing at import (see add_globals),
+        a function resolves without a module while an attribute or a route syncs one,
+        the resolved names are kept in the globals so they are only resolved once
+        """
+        Module.lazy = True
+        globals_input = globals_input if globals_input != None else {}
+        def __getattr__(name:str):
+            if name.startswith('__'):
+                raise AttributeError(f"module '{globals_input.get('__name__')}' has no attribute '{name}'")
+            if not name.startswith('_') and callable(getattr(Module, name, None)):
+                globals_input[name] = self.global_fn(name)
+            else:
+                module = Module()
+                for k,v in Module.route_map.items():
+                    globals_input.setdefault(k, module.route_fn(v, k))
+                for k,v in module.__dict__.items():
+                    globals_input.setdefault(k, v)
+                if name not in globals_input:
+                    raise AttributeError(f"module '{globals_input.get('__name__')}' has no attribute '{name}'")
+            return globals_input[name]
+        for name, value in list(globals_input.items()):
+            # the submodules (commune.module) are already globals so __getattr__ would not shadow them
+            if isinstance(value, type(sys)) and callable(getattr(Module, name, None)):
+                globals_input[name] = self.global_fn(name)
+        globals_input['__getattr__'] = __getattr__
         return globals_input
 
     def sync(self,  globals_input=None, max_age=10, update=True, **kwargs):
@@ -1563,14 +1869,46 @@ class Module:
         self.core_features = config['core_features']
         self.port_range = config['port_range'] # the port range between 50050 and 50150
         self.shortcuts =  self.shortys = config["shortcuts"]
+        if not Module.nested_asyncio:
+            import nest_asyncio
+            nest_asyncio.apply()
+            Module.nested_asyncio = True
         self.sync_routes()
-        self.sync_modules(max_age=max_age, update=update)
+        if not self.lazy:
+            # the lazy globals leave the git sync of the modules to c.sync_modules()
+            self.sync_modules(max_age=max_age, update=update)
 
         if globals_input != None:
             globals_input = self.add_globals(globals_input)
 
         return {'success': True, 'msg': 'synced config'}
         
+    def import_time(self, n:int = 5, modes:list = ['lazy', 'eager'], top:int = 10) -> dict:
+        """
+        the seconds `import commune` takes in a new interpreter (min and mean of n runs) for each mode (COMMUNE_LAZY),
+        with the slowest imports of the lazy mode from python -X importtime
+        """
+        import subprocess
+        code = 'import time; t0 = time.perf_counter(); import commune; print(time.perf_counter() - t0)'
+        results = {}
+        for mode in modes:
+            env = {**os.environ, 'COMMUNE_LAZY': str(int(mode == 'lazy'))}
+            times = []
+            for _ in range(n):
+                output = subprocess.check_output([sys.executable, '-c', code], env=env, cwd=self.lib_path)
+                times.append(float(output.decode().strip().split('\n')[-1]))
+            results[mode] = {'min': min(times), 'mean': sum(times) / n}
+        # every import writes "import time: {self us} | {cumulative us} | {name}" to stderr
+        env = {**os.environ, 'COMMUNE_LAZY': '1'}
+        output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import commune'], env=env, cwd=self.lib_path, capture_output=True).stderr.decode()
+        imports = []
+        for line in output.split('\n'):
+            fields = line.split(':', 1)[-1].split('|')
+            if line.startswith('import time:') and fields[1].strip().isdigit():
+                imports.append((int(fields[1]), fields[2].strip()))
+        results['slowest'] = {name: us / 1e6 for us, name in sorted(imports, reverse=True)[:top]}
+        return results
+
     def main(self,
                 fn='module/forward',  
                 module='module', 
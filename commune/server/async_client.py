@@ -0,0 +1,110 @@
+from typing import *
+import asyncio
+import aiohttp
+import commune as c
+from .client import Client
+
+class AsyncClient(Client):
+    """
+    the aiohttp version of the client, many calls share one event loop and connection pool
+    """
+    def __init__( self,  
+                 url : str = 'module',  
+                 key : Optional[str]= None,  
+                 network: Optional[bool] = 'local', 
+                 auth = 'auth.jwt',
+                 mode='http',
+                 wire = 'server.wire', # the binary wire format to negotiate with the server (None for json only)
+                 pool_size : int = 100, # the maximum number of open connections
+                 **kwargs):
+        self.auth = c.module(auth)()
+        self.wire = c.module(wire)() if wire else None
+        self.key  = c.get_key(key)
+        self.url = url
+        self.network = network or 'local'
+        self.pool_size = pool_size
+        self.session = None # created in the running event loop
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self.session == None or self.session.closed:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        return self.session
+
+    async def close(self):
+        if self.session != None and not self.session.closed:
+            await self.session.close()
+
+    async def forward(self, 
+                fn  = 'info', 
+                params: Optional[Union[list, dict]] = None, # if you want to pass params as a list or dict
+                # if you want to pass positional arguments to the function, use args 
+                args : Optional[list] = [], 
+                kwargs : Optional[dict] = {},      
+                ## adduitional parameters
+                timeout:int=2,  # the timeout for the request
+                key : str = None,  # the key to use for the request
+                mode: str  = 'http', # the mode of the request
+                stream: bool = False, # if the response is a stream
+                **extra_kwargs 
+    ):
+        if '/' in str(fn):
+            url, fn = '/'.join(fn.split('/')[:-1]), fn.split('/')[-1]
+        else :
+            url = self.url
+            fn = str(fn)
+        url = self.get_url(url, mode=mode)
+        key = self.get_key(key) # step 1: get the key
+        params = self.get_params(params=params, args=args, kwargs=kwargs, extra_kwargs=extra_kwargs) # step 3: get the params
+        headers = self.auth.get_headers({'fn': fn, 'params': params}, key=key) # step 4: get the headers
+        body = self.get_body(url, params, headers)
+        session = await self.get_session()
+        response = await session.post(f"{url}/{fn}/", **body, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout))
+        ## handle the response
+        if response.status != 200:
+            raise Exception(await response.text())
+        content_type = response.headers.get('Content-Type', '')
+        if 'text/event-stream' in content_type:
+            return self.stream(response)
+        try:
+            if self.is_wire_response(url, response.headers):
+                result = self.wire.decode(await response.read())
+            elif 'application/json' in content_type:
+                result = await response.json()
+            elif 'text/plain' in content_type:
+                result = await response.text()
+            else:
+                result = await response.read()
+        finally:
+            response.release()
+        return result
+
+    async def stream(self, response):
+        try:
+            async for line in response.content:
+                yield self.process_stream_line(line.rstrip(b'\r\n'))
+        except Exception as e:
+            yield c.detailed_error(e)
+        finally:
+            response.release()
+
+    async def forward_many(self, 
+                           targets:List[str], 
+                           fn:str = 'info', 
+                           params:Optional[Union[list, dict]] = None, 
+                           concurrency:int = 64, 
+                           timeout:int = 10, 
+                           **kwargs) -> list:
+        """
+        calls {target}/{fn} for every target with at most concurrency calls in flight
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        async def call(target):
+            async with semaphore:
+                try:
+                    return await self.forward(f'{target}/{fn}', params=params, timeout=timeout, **kwargs)
+                except Exception as e:
+                    return c.detailed_error(e)
+        try:
+            return await asyncio.gather(*[call(target) for target in targets])
+        finally:
+            await self.close()
@@ -4,22 +4,54 @@ from typing import *
 import asyncio
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import threading
 import os
 import commune as c
 
 class Client:
+    sessions = {} # (pool_size, retries, backoff) -> the session shared by the clients of the process
+    sessions_lock = threading.Lock()
+    namespaces = {} # namespace path -> (mtime, namespace)
+    wire_urls = set() # the urls that answered in the wire format, their requests are sent in it too
+
     def __init__( self,  
                  url : str = 'module',  
                  key : Optional[str]= None,  
                  network: Optional[bool] = 'local', 
                  auth = 'auth.jwt',
                  mode='http',
+                 wire = 'server.wire', # the binary wire format to negotiate with the server (None for json only)
+                 pool_size : int = 100, # the number of kept-alive connections per host
+                 retries : int = 3, # the number of retries when the connection fails
+                 backoff : float = 0.1, # (in seconds) the backoff factor between the retries
                  **kwargs):
         self.auth = c.module(auth)()
+        self.wire = c.module(wire)() if wire else None
         self.key  = c.get_key(key)
         self.url = url
+        self.network = network or 'local'
+        self.session = self.get_session(pool_size=pool_size, retries=retries, backoff=backoff)
         print(f"Client url: {self.url}")
 
+    @classmethod
+    def get_session(cls, pool_size:int = 100, retries:int = 3, backoff:float = 0.1) -> requests.Session:
+        """
+        gets the pooled keep-alive session, only connection errors are retried as the calls are not idempotent
+        """
+        k = (pool_size, retries, backoff)
+        if k not in cls.sessions:
+            with cls.sessions_lock:
+                if k not in cls.sessions:
+                    session = requests.Session()
+                    retry = Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=backoff)
+                    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    cls.sessions[k] = session
+        return cls.sessions[k]
+
     def forward(self, 
                 fn  = 'info', 
                 params: Optional[Union[list, dict]] = None, # if you want to pass params as a list or dict
@@ -42,13 +74,15 @@ class Client:
         key = self.get_key(key) # step 1: get the key
         params = self.get_params(params=params, args=args, kwargs=kwargs, extra_kwargs=extra_kwargs) # step 3: get the params
         headers = self.auth.get_headers({'fn': fn, 'params': params}, key=key) # step 4: get the headers
-        with requests.Session() as conn:
-            response = conn.post( f"{url}/{fn}/", json=params,  headers=headers, timeout=timeout, stream=stream)
+        body = self.get_body(url, params, headers)
+        response = self.session.post( f"{url}/{fn}/", **body,  headers=headers, timeout=timeout, stream=stream)
         ## handle the response
         if response.status_code != 200:
             raise Exception(response.text)
         if 'text/event-stream' in response.headers.get('Content-Type', ''):
             result = self.stream(response)
+        elif self.is_wire_response(url, response.headers):
+            result = self.wire.decode(response.content)
         else:
             if 'application/json' in response.headers.get('Content-Type', ''):
                 result = response.json()
@@ -60,6 +94,25 @@ class Client:
                     raise Exception(result)
         return result
     
+    def get_body(self, url:str, params:dict, headers:dict) -> dict:
+        """
+        sends the params in the wire format if the server answered in it before, otherwise in json
+        """
+        if self.wire == None:
+            return {'json': params}
+        headers['Accept'] = f'{self.wire.content_type}, application/json'
+        if url in self.wire_urls:
+            headers['Content-Type'] = self.wire.content_type
+            return {'data': self.wire.encode(params)}
+        return {'json': params}
+
+    def is_wire_response(self, url:str, headers:dict) -> bool:
+        if self.wire != None and self.wire.is_wire(headers):
+            self.wire_urls.add(url)
+            return True
+        self.wire_urls.discard(url) # the server only speaks json
+        return False
+
     def get_key(self,key=None):
         if key == None:
             return self.key
@@ -91,10 +144,25 @@ class Client:
         elif c.is_int(url):
             url = f'0.0.0.0:{url}'
         else:
-            url = c.namespace().get(str(url), url)
+            url = self.namespace().get(str(url), url)
         url = url if url.startswith(mode) else f'{mode}://{url}'
         return url
 
+    def namespace(self, network:str = None) -> dict:
+        """
+        reads the namespace registry of the servers, it is only reloaded when the file changes
+        """
+        network = network or self.network
+        path = os.path.expanduser(f'~/.commune/server/{network}/namespace.json')
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return c.namespace(network=network) # builds the registry
+        if self.namespaces.get(path, (None,))[0] != mtime:
+            with open(path, 'r') as f:
+                self.namespaces[path] = (mtime, json.load(f))
+        return self.namespaces[path][1]
+
 
     @classmethod
     def call(cls, 
@@ -118,22 +186,39 @@ class Client:
                                                             key=key)
 
     def stream(self, response):
-        def process_stream_line(line , stream_prefix = 'data: '):
-            event_data = line.decode('utf-8')
-            if event_data.startswith(stream_prefix):
-                event_data = event_data[len(stream_prefix):] 
-            if event_data == "": # skip empty lines if the event data is empty
-                return ''
-            if isinstance(event_data, str):
-                if event_data.startswith('{') and event_data.endswith('}') and 'data' in event_data:
-                    event_data = json.loads(event_data)['data']
-            return event_data
         try:
             for chunk in response.iter_lines():
-                yield process_stream_line(chunk)
+                yield self.process_stream_line(chunk)
         except Exception as e:
             yield c.detailed_error(e)
 
+    def process_stream_line(self, line , stream_prefix = 'data: '):
+        event_data = line.decode('utf-8')
+        if event_data.startswith(stream_prefix):
+            event_data = event_data[len(stream_prefix):] 
+        if event_data == "": # skip empty lines if the event data is empty
+            return ''
+        if isinstance(event_data, str):
+            if event_data.startswith('{') and event_data.endswith('}') and 'data' in event_data:
+                event_data = json.loads(event_data)['data']
+        return event_data
+
+    @classmethod
+    def call_many(cls, 
+                  targets:List[str], 
+                  fn:str = 'info', 
+                  params:Optional[Union[list, dict]] = None, 
+                  concurrency:int = 64, 
+                  timeout:int = 10, 
+                  key:Optional[str] = None,
+                  network:str = 'local') -> list:
+        """
+        calls fn on every target (name or url) on one event loop with at most concurrency calls in flight,
+        the failed calls are returned as errors in the position of their target
+        """
+        client = c.module('server.async_client')(key=key, network=network, pool_size=concurrency)
+        return c.get_event_loop().run_until_complete(client.forward_many(targets, fn=fn, params=params, concurrency=concurrency, timeout=timeout))
+
     def is_url(self,  url:str) -> bool:
         if not isinstance(url, str):
             return False
@@ -159,7 +244,7 @@ class Client:
                     return getattr(self, key)
                 else:
                     return lambda *args, **kwargs : self.remote_call(*args, remote_fn=key, **kwargs)
-        client = Client(url=module)
+        client = Client(url=module, network=network, **kwargs)
         return ClientVirtual(client) if virtual else client
 
     def connect(self, module:str, **kwargs):
@@ -1,23 +1,55 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 from starlette.responses import JSONResponse
-from starlette.middleware.cors import CORSMiddleware
-class Middleware(BaseHTTPMiddleware):
-    def __init__(self, app, 
-                max_bytes: int = 1000000, 
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+class RequestTooLarge(Exception):
+    pass
+
+class Middleware:
+    """
+    pure asgi middleware that caps the request size while the body streams through
+    (without buffering it) and the number of requests in flight
+    """
+    def __init__(self, app: ASGIApp,
+                max_bytes: int = 1000000,
                 max_requests: int = 1000,
                 ):
-        super().__init__(app)
+        self.app = app
         self.max_bytes = max_bytes
-    async def dispatch(self, request: Request, call_next):
-        # Check if the request method is allowed
-        # pass through cors middleware
-        content_length = request.headers.get('content-length')
-        if content_length:
-            if int(content_length) > self.max_bytes:
-                return JSONResponse(status_code=413, content={"error": "Request too large"})
-        body = await request.body()
-        if len(body) > self.max_bytes:
-            return JSONResponse(status_code=413, content={"error": "Request too large"})
-        response = await call_next(request)
-        return response
\ No newline at end of file
+        self.max_requests = max_requests
+        self.requests = 0 # the requests in flight, only touched by the event loop
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        content_length = dict(scope['headers']).get(b'content-length')
+        if content_length and int(content_length) > self.max_bytes:
+            return await JSONResponse(status_code=413, content={"error": "Request too large"})(scope, receive, send)
+        if self.requests >= self.max_requests:
+            return await JSONResponse(status_code=503, content={"error": "Too many requests"})(scope, receive, send)
+        state = {'bytes': 0, 'too_large': False, 'started': False}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message['type'] == 'http.request':
+                state['bytes'] += len(message.get('body', b''))
+                if state['bytes'] > self.max_bytes:
+                    state['too_large'] = True
+                    raise RequestTooLarge(f'Request too large (>{self.max_bytes} bytes)')
+            return message
+
+        async def send_wrapper(message):
+            if state['too_large'] and not state['started']:
+                return # the app answered the aborted request, it is replaced by the 413
+            if message['type'] == 'http.response.start':
+                state['started'] = True
+            await send(message)
+
+        self.requests += 1
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except RequestTooLarge:
+            pass
+        finally:
+            self.requests -= 1
+        if state['too_large'] and not state['started']:
+            await JSONResponse(status_code=413, content={"error": "Request too large"})(scope, receive, send)
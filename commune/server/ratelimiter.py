@@ -0,0 +1,125 @@
+import os
+import time
+import threading
+import commune as c
+
+class RateLimiter:
+    """
+    sliding window rate limiter keyed by {module}/{caller}
+    the window (tempo) is split into buckets of cost so a call never scans the call history,
+    each process persists its window to {path}/{name}.json so the limits survive restarts
+    and the other workers serving the same module are counted too
+    """
+    def __init__(self,
+                 path:str = '~/.commune/server/rate_limiter', # the directory the windows are persisted to
+                 tempo:int = 10000, # (in seconds) the size of the sliding window
+                 buckets:int = 100, # the number of buckets in the window
+                 sync_interval:float = 5, # (in seconds) how often to persist and load the peers (0 disables)
+                 name:str = '0', # the name of this process (worker)
+                 ):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.tempo = tempo
+        self.buckets = buckets
+        self.bucket_size = tempo / buckets
+        self.sync_interval = sync_interval
+        self.name = str(name)
+        self.lock = threading.Lock()
+        self.windows = {} # address -> {bucket: cost}, the buckets are in increasing order
+        self.totals = {} # address -> the total cost in the window
+        self.peer_totals = {} # address -> the total cost of the other processes
+        for address, window in c.get(self.window_path(self.name), {}).items():
+            for bucket, cost in window.items():
+                self.add(address, cost=cost, bucket=int(bucket))
+        if sync_interval > 0:
+            self.sync()
+            c.thread(self.sync_loop)
+
+    def bucket(self, t:float = None) -> int:
+        return int((t or time.time()) // self.bucket_size)
+
+    def window_path(self, name:str) -> str:
+        return f'{self.path}/{name}.json'
+
+    def expire(self, address:str, bucket:int = None) -> float:
+        """
+        drops the buckets that are older than the window and returns the remaining cost
+        """
+        window = self.windows.get(address)
+        if window == None:
+            return 0
+        bucket = self.bucket() if bucket == None else bucket
+        oldest = bucket - self.buckets + 1
+        while window:
+            first = next(iter(window))
+            if first >= oldest:
+                break
+            self.totals[address] -= window.pop(first)
+        if not window:
+            self.windows.pop(address)
+            return self.totals.pop(address)
+        return self.totals[address]
+
+    def add(self, address:str, cost:float = 1, bucket:int = None):
+        bucket = self.bucket() if bucket == None else bucket
+        window = self.windows.setdefault(address, {})
+        window[bucket] = window.get(bucket, 0) + cost
+        self.totals[address] = self.totals.get(address, 0) + cost
+
+    def rate(self, address:str) -> float:
+        """
+        the total cost of the calls from the address within the window
+        """
+        with self.lock:
+            return self.expire(address) + self.peer_totals.get(address, 0)
+
+    def consume(self, address:str, cost:float = 1, limit:float = float('inf')) -> bool:
+        """
+        adds the cost of a call if it fits in the limit
+        """
+        with self.lock:
+            rate = self.expire(address) + self.peer_totals.get(address, 0)
+            if rate + cost > limit:
+                return False
+            self.add(address, cost=cost)
+            return True
+
+    def sync(self):
+        """
+        persists this window and loads the totals of the other processes
+        """
+        bucket = self.bucket()
+        oldest = bucket - self.buckets + 1
+        with self.lock:
+            for address in list(self.windows.keys()):
+                self.expire(address, bucket=bucket)
+            windows = {a: dict(w) for a, w in self.windows.items()}
+        c.put(self.window_path(self.name), windows)
+        peer_totals = {}
+        for path in c.ls(self.path):
+            if not path.endswith('.json') or path == self.window_path(self.name):
+                continue
+            if time.time() - os.path.getmtime(path) > self.tempo:
+                os.remove(path) # the process stopped writing before the window
+                continue
+            for address, window in c.get(path, {}).items():
+                cost = sum([v for k,v in window.items() if int(k) >= oldest])
+                peer_totals[address] = peer_totals.get(address, 0) + cost
+        self.peer_totals = peer_totals
+        return {'addresses': len(windows), 'peers': len(peer_totals)}
+
+    def sync_loop(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception as e:
+                c.print(f'RateLimiterSyncError({c.detailed_error(e)})', color='red')
+
+    def test(self, address='test', limit=3):
+        limiter = RateLimiter(path='~/.commune/server/rate_limiter/test', tempo=10, sync_interval=0)
+        for i in range(limit):
+            assert limiter.consume(address, limit=limit), f'call {i} should be allowed'
+        assert not limiter.consume(address, limit=limit), 'call should be rate limited'
+        assert limiter.rate(address) == limit, f'rate {limiter.rate(address)} != {limit}'
+        assert limiter.consume(address, cost=0.5, limit=limit + 1), 'cheaper call should fit'
+        return {'success': True, 'msg': 'rate limiter test passed'}
@@ -7,8 +7,16 @@ import os
 import json
 import os
 import os
+import sys
 import json
+import fcntl
+import signal
+import socket
 import asyncio
+import inspect
+import multiprocessing
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 import commune as c
 
 class Server:
@@ -27,12 +35,16 @@ class Server:
         network: Optional[str] = 'local', # the network the server is running on
         tx_path: Optional[str] = None, # the path to the user data (txs)
         timeout:int = 10, # (in seconds) the maximum time to wait for a response
+        max_workers:int = 32, # the maximum number of threads for running sync functions
+        workers:int = 1, # the number of worker processes sharing the port
 
         # EXTERNAL MODULES
         serializer = 'serializer', # the serializer for the server serializes and deserializes the data for the server if it is not a string
+        wire = 'server.wire', # the binary wire format the clients can negotiate instead of json
         auth = 'auth.jwt', # the auth for the server,
         middleware = 'middleware', # the middleware for the server
-        txtracker = 'txhistory', # the txtracker for the server
+        txtracker = 'server.txlog', # the txtracker for the server
+        rate_limiter = 'server.ratelimiter', # the rate limiter for the server
         pm = 'pm2', # the process manager for the server
         helper_functions  = ['info', 'forward'], # the helper functions
 
@@ -40,6 +52,7 @@ class Server:
         verbose:bool = True, # whether to print the output
         info = None, # the info for the server
         run_api : Optional[bool] = False, # if the server should be run as an api
+        watch_tree : bool = False, # whether to keep the module tree fresh with a file watcher (see Module.watch), off by default as it watches the whole tree
 
         ) -> 'Server':
 
@@ -49,14 +62,23 @@ class Server:
         self.modules_path = f'{self.get_path(self.network)}/modules'
         self.verbose = verbose
         self.timeout = timeout
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers) # runs the sync functions off the event loop
         self.pm = c.module(pm)(proc_prefix= 'server/' + network + '/')
         self.txtracker = c.module(txtracker)(tx_path or self.get_path('transactions'))
         # set modules 
         self.serializer = c.module(serializer)()
+        self.wire = c.module(wire)()
+        self.rate_limiter_module = rate_limiter
+        self.watch_tree = watch_tree
         if run_api:
             self.auth = c.module(auth)()
             self.set_module(module=module, name=name, key=key, params=params, functions=functions, port=port)
-            self.loop = asyncio.get_event_loop() # get the event loop
+            if workers == 1:
+                self.set_rate_limiter()
+                self.set_roles()
+                if watch_tree:
+                    c.watch()
             app = FastAPI()
             app.add_middleware(c.module(middleware))
             app.add_middleware(
@@ -66,27 +88,82 @@ class Server:
                 allow_methods=["*"],
                 allow_headers=["*"],
             )
-            def server_function(fn: str, request: Request):
+            async def server_function(fn: str, request: Request):
                 try:
-                    return self.forward(fn, request)
+                    return await self.forward(fn, request)
                 except Exception as e:
                     err = c.detailed_error(e)
                     c.print(f'Error({fn}) --> {err}', color='red')
                     return err
             app.post("/{fn}")(server_function)
             c.print(f'Served({self.module.info})', color='purple')
-            uvicorn.run(app, host='0.0.0.0', port=self.module.port, loop='asyncio')
+            if workers > 1:
+                self.run_workers(app, workers=workers)
+            else:
+                uvicorn.run(app, host='0.0.0.0', port=self.module.port, loop='asyncio')
+
+    def run_workers(self, app:FastAPI, workers:int = 2, backlog:int = 2048):
+        """
+        pre-forks the workers onto one listening socket, the kernel balances the connections between them,
+        the workers are not daemonic so the modules can start processes (they are terminated in the finally block).
+        the rate limits are only eventually consistent across the workers, each worker loads the totals of its peers
+        every sync_interval of the rate limiter, so within that interval a caller can be admitted its full limit by each worker
+        params:
+            app : FastAPI
+                the app to serve in each worker
+            workers : int
+                the number of worker processes
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('0.0.0.0', self.module.port))
+        sock.listen(backlog)
+        sock.set_inheritable(True)
+        ctx = multiprocessing.get_context('fork')
+        procs = [ctx.Process(target=self.serve_worker, args=(app, sock, i)) for i in range(workers)]
+        for p in procs:
+            p.start()
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0)) # exit through the finally block
+        try:
+            for p in procs:
+                p.join()
+        finally:
+            for p in procs:
+                if p.is_alive():
+                    p.terminate()
+            sock.close()
+
+    def serve_worker(self, app:FastAPI, sock:socket.socket, worker_id:int = 0):
+        """
+        runs a worker process with its own module instance on the shared socket
+        """
+        self.worker_id = worker_id
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        module = self.module
+        self.module = module.__class__(**self.module_params)
+        for k in ['name', 'key', 'port', 'url']:
+            setattr(self.module, k, getattr(module, k))
+        self.set_functions(module.fns)
+        self.module.info = module.info
+        self.set_rate_limiter(worker_id=worker_id)
+        self.set_roles()
+        if self.watch_tree:
+            c.watch() # the watcher thread of the parent does not survive the fork
+        config = uvicorn.Config(app, host='0.0.0.0', port=self.module.port, loop='asyncio')
+        uvicorn.Server(config).run(sockets=[sock])
 
     def fleet(self, module='module', n=2, timeout=10):
         if '::' not in module:
             module = module + '::'
         names = [module+str(i) for i in range(n)]
+        c.add_keys(names) # creates the missing keys in parallel before the servers start
         return c.wait([c.submit(self.serve, [names[i]])  for i in range(n)], timeout=timeout)
 
-    def forward(self, fn:str, request: Request):
+    async def forward(self, fn:str, request: Request):
 
         """
-        gets and verifies the request
+        gets and verifies the request, async functions are awaited on the event loop 
+        and sync functions are run in the thread pool (self.executor)
         params:
             fn : str
                 the function to call
@@ -98,13 +175,16 @@ class Server:
                 params : dict
                 client : dict (headers)
         """
-        params = self.loop.run_until_complete(request.json())
-        params = self.serializer.deserialize(params) 
-        params = json.loads(params) if isinstance(params, str) else params
         headers = dict(request.headers)
+        if self.wire.is_wire(headers):
+            params = self.wire.decode(await request.body())
+        else:
+            params = await request.json()
+            params = self.serializer.deserialize(params) 
+            params = json.loads(params) if isinstance(params, str) else params
         data = {'fn': fn, 'params': params}
-        data['client'] = self.auth.verify_headers(headers=headers, data=data) # verify the headers
-        self.rate_limit(data)   # check the rate limit
+        data['client'] = await self.run_sync(self.auth.verify_headers, headers=headers, data=data) # verify the headers
+        await self.run_sync(self.rate_limit, data)   # check the rate limit
         if self.verbose:
             shortkey = lambda x: x[:3] + '...' + x[-3:]
             c.print(f'fn(fn={fn} client={shortkey(data["client"]["key"])})', color='green')
@@ -116,23 +196,50 @@ class Server:
             args = []
             kwargs = dict(params)
         params = {"args": args, "kwargs": kwargs}
-        result = fn_obj(*args, **kwargs) if callable(fn_obj) else fn_obj
+        if not callable(fn_obj):
+            result = fn_obj
+        elif inspect.iscoroutinefunction(fn_obj):
+            result = await fn_obj(*args, **kwargs)
+        else:
+            result = await self.run_sync(fn_obj, *args, **kwargs)
         if c.is_generator(result):
-            output = str(result)
             def generator_wrapper(generator):
                 for item in generator:
                     print(item, end='')
                     yield item
             result = EventSourceResponse(generator_wrapper(result))   
+        elif inspect.isasyncgen(result):
+            async def async_generator_wrapper(generator):
+                async for item in generator:
+                    print(item, end='')
+                    yield item
+            result = EventSourceResponse(async_generator_wrapper(result))
         data['time'] = data['client']['time']
         data[f'result'] = 'stream' if isinstance(result, EventSourceResponse) else result
-        data['server'] = self.auth.get_headers(data=data, key=self.module.key)
+        data['server'] = await self.run_sync(self.auth.get_headers, data=data, key=self.module.key) # signs the result off the event loop
         data['duration'] = c.time() - float(data['client']['time'])
         data['schema'] = self.module.schema.get(data['fn'], {})
         path = f'{self.module.name}/{data["client"]["key"]}/{data["fn"]}/{data["time"]}.json'
-        self.txtracker.save_data(path, data)
+        self.txtracker.save_data(path, data) # queued and written in batches by the txtracker
+        if not isinstance(result, EventSourceResponse):
+            result = self.wire.response(result, headers) # falls back to json if msgpack cannot encode the result
         return result
+
+    async def run_sync(self, fn:callable, *args, **kwargs):
+        """
+        runs a sync function in the thread pool without blocking the event loop
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
   
+    def set_rate_limiter(self, worker_id:int = 0):
+        """
+        sets the rate limiter of the process, the workers of a module share their windows through its path
+        """
+        path = self.get_path(f'rate_limiter/{self.module.name}')
+        self.rate_limiter = c.module(self.rate_limiter_module)(path=path, tempo=self.tempo, name=worker_id)
+        return {'success':True, 'message':f'Set rate limiter to {path}'}
+
     def get_path(self, path):
         return  os.path.expanduser('~/.commune') + '/server/' + path
         
@@ -143,7 +250,8 @@ class Server:
                 name = module
                 tag = name.split('::')[-1]
                 module = '::'.join(name.split('::')[:-1])
-        self.module = c.module(module)(**(params or {}))
+        self.module_params = params or {}
+        self.module = c.module(module)(**self.module_params)
         self.module.name = name = name or module 
         self.module.key = c.get_key(key or self.module.name)
         self.set_functions(functions) 
@@ -217,6 +325,7 @@ class Server:
             print(f'Waiting for port {port} to be free')
         self.module.port = port
         self.module.url = f'0.0.0.0:{self.module.port}' 
+        self.add_server(self.module.name, self.module.url)
         return {'success':True, 'message':f'Set port to {port}'}
 
     def serve(self, 
@@ -228,6 +337,7 @@ class Server:
               functions = None, # list of functions to serve, if none, it will be the endpoints of the module
               key = None, # the key for the server
               cwd = None,
+              workers:int = 1, # the number of worker processes sharing the port
               **extra_params
               ):
 
@@ -238,7 +348,7 @@ class Server:
             params = {k : v for k, v  in c.locals2kwargs(locals()).items()  if k not in ['extra_params', 'response', 'namespace']}
             self.pm.run("server/serve", name=name, params=params, cwd=cwd)
             return self.wait_for_server(name)
-        return Server(module=module, name=name, functions=functions, params=params, port=port,  key=key, run_api=1)
+        return Server(module=module, name=name, functions=functions, params=params, port=port,  key=key, workers=workers, run_api=1)
 
     def get_port(self, name:str,  tail:int=100, **kwargs):
         """
@@ -252,10 +362,50 @@ class Server:
                 return int(line.split(tag)[-1].split(' ')[0].split(':')[-1])
         return port
 
-    def namespace(self,  search=None, **kwargs) -> dict:
-        namespace =  {s: u for s, u in zip(self.servers(), self.urls())}
+    def namespace(self,  search=None, network:str=None, update:bool=False, **kwargs) -> dict:
+        """
+        the registry of {name: url} that the servers write when they set their port,
+        it is only rebuilt from the process manager if it is missing or update=True
+        """
+        namespace = None if update else self.get_namespace(network=network)
+        if namespace == None:
+            namespace =  {s: u for s, u in zip(self.servers(), self.urls())}
+            self.update_namespace(lambda _: namespace, network=network)
         return {k:v for k, v in namespace.items() if search in k} if search != None else namespace
 
+    def namespace_path(self, network:str=None) -> str:
+        return self.get_path(f'{network or self.network}/namespace.json')
+
+    def get_namespace(self, network:str=None) -> Optional[dict]:
+        path = self.namespace_path(network)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def update_namespace(self, fn:callable, network:str=None) -> dict:
+        """
+        applies fn to the namespace under a file lock and replaces the registry atomically
+        """
+        path = self.namespace_path(network)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            namespace = fn(self.get_namespace(network=network) or {})
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(namespace, f)
+            os.replace(tmp_path, path)
+        return namespace
+
+    def add_server(self, name:str, url:str, network:str=None) -> dict:
+        self.update_namespace(lambda namespace: {**namespace, name: url}, network=network)
+        return {'success':True, 'message':f'Added {name} --> {url}'}
+
+    def rm_server(self, name:str, network:str=None) -> dict:
+        self.update_namespace(lambda namespace: {k:v for k,v in namespace.items() if k != name}, network=network)
+        return {'success':True, 'message':f'Removed {name}'}
+
     def get_url(self, name:str,  tail:int=100, **kwargs):
         return f'0.0.0.0:{self.get_port(name, tail=tail, **kwargs)}'
 
@@ -278,8 +428,7 @@ class Server:
 
         modules = c.get(self.modules_path, max_age=max_age, update=update)
         if modules == None:
-            futures  = [c.submit(c.call, [s + '/info'], timeout=timeout) for s in self.urls()]
-            modules = c.wait(futures, timeout=timeout)
+            modules = c.call_many(self.urls(), fn='info', timeout=timeout)
             c.put(self.modules_path, modules)
         if search != None:
             modules = [m for m in modules if search in m['name']]
@@ -289,23 +438,20 @@ class Server:
         return bool(name in self.servers(**kwargs))
 
     def rate_limit(self, data:dict, # fn, params and client/headers
-                network:str = 'chain', # the network to gate on
                 role2rate:dict = {'admin': 100000000, 'owner': 10000000, 'local': 1000000}, # the rate limits for each role
                 stake_per_call:int = 1000, # the amount of stake required per call
             ) -> dict:
         fn = data['fn']
         params = data['params']
         client = data['client'] if 'client' in data else data['headers'] # also known as the headers
-        self.address2key = c.address2key()
-        if not hasattr(self, 'state'):
-            self.state = None
+        roles = self.roles # the snapshot is swapped as a whole by sync_roles so it is read without a lock
         module = self.module
         address = client['key']
-        if c.is_admin( client['key']):
+        if address == roles['admin']:
             role =  'admin'
-        elif address == module.key.key_address:
+        elif address == roles['owner']:
             role =  'owner'
-        elif address in self.address2key:
+        elif address in roles['local']:
             role =  'local'
         else:
             role = 'guest'
@@ -314,28 +460,72 @@ class Server:
         if role in role2rate:
             rate_limit = role2rate[role]
         else:
-            path = self.get_path(f'rate_limiter/{network}_state')
-            self.state = c.get(path, max_age=self.tempo)
-            if self.state == None:
-                self.state = c.module(network)().state()
             # the amount of stake the user has as a module only
-            stake = self.state['stake'].get(client['key'], 0) 
-            stake_to_me = self.state['stake_from'].get(module.key.ss58_address, {}).get(client['key'], 0) 
-            stake = stake + stake_to_me
+            stake = roles['stake'].get(address, 0) + roles['stake_to_me'].get(address, 0)
             rate_limit = stake / stake_per_call
-        rate_limit = rate_limit / module.fn2cost.get(fn, 1)
-        rate = self.rate(self.module.name+'/'+client['key'])
-        assert rate < rate_limit, f'RateExceeded(rate={rate} limit={rate_limit}, caller={shortkey(client["key"])})' 
+        cost = module.fn2cost.get(fn, 1)
+        caller = self.module.name+'/'+client['key']
+        if not self.rate_limiter.consume(caller, cost=cost, limit=rate_limit):
+            shortkey = lambda x: x[:3] + '...' + x[-3:]
+            raise Exception(f'RateExceeded(rate={self.rate(caller)} cost={cost} limit={rate_limit}, caller={shortkey(client["key"])})')
         return rate_limit
         
     def rate(self, address:str):
-        path2age = self.txtracker.path2age(address)
-        for path, age  in path2age.items():
-            if age > self.tempo:
-                if os.path.exists(path):
-                    print(f'RemovingStalePath(age={age} tempo={self.tempo}) --> {path}')
-                    os.remove(path)
-        return len(self.txtracker.call_paths(address))
+        return self.rate_limiter.rate(address)
+
+    def set_roles(self, network:str = 'chain', interval:int = 10):
+        """
+        builds the role cache (address -> role, stake) and refreshes it in the background 
+        when the key directory changes or the cache is older than the tempo
+        params:
+            network : str
+                the network to get the stake from
+            interval : int
+                (in seconds) how often to check for changes
+        """
+        self.roles_network = network
+        self.sync_roles() # fetches the state once if there is none cached so the staked guests are not limited as unstaked
+        c.thread(self.roles_loop, kwargs={'interval': interval})
+        return {'success':True, 'message':f'Set roles from {network}'}
+
+    def sync_roles(self, update_state:bool = True) -> dict:
+        """
+        resolves the roles and stake once and swaps them in as a single snapshot
+        """
+        key_path = self.module.key.storage_path
+        path = self.get_path(f'rate_limiter/{self.roles_network}_state')
+        state = c.get(path, max_age=self.tempo)
+        if state == None and update_state:
+            try:
+                state = c.module(self.roles_network)().state()
+                c.put(path, state)
+            except Exception as e:
+                c.print(f'StateSyncError({self.roles_network}) --> {c.detailed_error(e)}', color='red')
+        synced_state = state != None
+        state = state or {'stake': {}, 'stake_from': {}}
+        self.roles = {
+            'admin': c.get_key().key_address,
+            'owner': self.module.key.key_address,
+            'local': c.address2key(),
+            'stake': state['stake'],
+            'stake_to_me': state['stake_from'].get(self.module.key.ss58_address, {}),
+            'synced_state': synced_state, # the background loop retries until the chain state is fetched
+            'key_mtime': os.path.getmtime(key_path) if os.path.exists(key_path) else 0,
+            'time': c.time(),
+        }
+        return self.roles
+
+    def roles_loop(self, interval:int = 10):
+        while True:
+            try:
+                roles = self.roles
+                key_path = self.module.key.storage_path
+                key_mtime = os.path.getmtime(key_path) if os.path.exists(key_path) else 0
+                if key_mtime != roles['key_mtime'] or not roles['synced_state'] or c.time() - roles['time'] > self.tempo:
+                    self.sync_roles()
+            except Exception as e:
+                c.print(f'RolesSyncError({c.detailed_error(e)})', color='red')
+            c.sleep(interval)
 
     def wait_for_server(self, name:str, trials:int=10, trial_backoff:int=1, network:str='local', max_age:int=60):
         # wait for the server to start
@@ -358,9 +548,11 @@ class Server:
         return self.txtracker.clear_history(address)
 
     def kill(self, name):
+        self.rm_server(name)
         return self.pm.kill(name)
 
     def kill_all(self):
+        self.update_namespace(lambda _: {})
         return self.pm.kill_all()
     
     def logs(self, name, **kwargs):
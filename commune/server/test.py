@@ -20,6 +20,23 @@ class Test:
         c.kill(name)
         assert name not in c.servers()
         return {'success': True, 'msg': 'server test passed'}
+    def test_rate_limiter(self):
+        return c.module('server.ratelimiter')(sync_interval=0).test()
+    def test_txlog(self):
+        return c.module('server.txlog')().test()
+    def test_wire(self):
+        return c.module('server.wire')().test()
+    def test_wire_rejects_objects(self):
+        import msgpack, pickle
+        wire = c.module('server.wire')()
+        for kind in [b'O', b'']: # with and without the object kind
+            array = {b'nd': True, b'type': '|O', b'kind': kind, b'shape': [1], b'data': pickle.dumps([1])}
+            try:
+                wire.decode(msgpack.packb({'params': array}, use_bin_type=True))
+                assert False, 'object arrays must not be decoded (they are pickled)'
+            except ValueError:
+                pass
+        return {'success': True, 'msg': 'wire object rejection test passed'}
     def test_executor(self):
         return c.module('executor')().test()
 
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+import commune as c
+
+class TxLog:
+    """
+    append-only transaction log for the server
+    the txs are queued on the request path and written in batches by a background thread
+    into one sqlite database (wal mode) that the workers of a server share
+    """
+    def __init__(self,
+                 path:str = '~/.commune/server/transactions', # the directory of the database
+                 batch_size:int = 1000, # the maximum number of txs per write
+                 flush_interval:float = 1, # (in seconds) how often to write the queued txs
+                 ):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.db_path = self.path + '/txlog.db'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(self.path, exist_ok=True)
+        with self.connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS txs (path TEXT, module TEXT, client TEXT, fn TEXT, time REAL, data TEXT)')
+            conn.execute('CREATE INDEX IF NOT EXISTS txs_path ON txs (path)')
+        self.pid = None
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def start(self):
+        """
+        starts the writer of this process, a forked worker gets its own queue and thread
+        """
+        self.pid = os.getpid()
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        c.thread(self.flush_loop)
+        atexit.register(self.flush) # once per process that saves txs, not per instance
+
+    def save_data(self, path:str, data:dict):
+        """
+        queues the tx stored at {module}/{client}/{fn}/{time}.json
+        """
+        if self.pid != os.getpid():
+            self.start()
+        path = path[:-len('.json')] if path.endswith('.json') else path
+        module, client, fn, t = path.split('/')[-4:]
+        self.queue.put((path, module, client, fn, float(t), data)) # serialized by the writer, off the request path
+        return {'success': True, 'path': path}
+
+    def flush(self) -> int:
+        """
+        writes the queued txs in one transaction per batch, 
+        the txs of a batch that fails to write are queued again for the next flush
+        """
+        if self.pid != os.getpid():
+            return 0
+        n = 0
+        with self.lock:
+            while not self.queue.empty():
+                batch, rows = [], []
+                while len(batch) < self.batch_size and not self.queue.empty():
+                    row = self.queue.get_nowait()
+                    try:
+                        rows.append(row[:-1] + (json.dumps(row[-1], default=str),))
+                        batch.append(row)
+                    except Exception as e:
+                        c.print(f'TxLogSerializeError({row[0]}) --> {e}', color='red')
+                try:
+                    with self.connect() as conn:
+                        conn.executemany('INSERT INTO txs VALUES (?, ?, ?, ?, ?, ?)', rows)
+                except sqlite3.Error as e:
+                    for row in batch:
+                        self.queue.put(row)
+                    c.print(f'TxLogWriteError({e}) --> {len(batch)} txs queued again', color='red')
+                    break
+                n += len(rows)
+        return n
+
+    def flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                c.print(f'TxLogFlushError({c.detailed_error(e)})', color='red')
+
+    def get_history(self, address:str = '', paths:list = None, df:bool = True, features:list = None, max_age:float = None):
+        """
+        gets the txs whose path starts with the address ({module}/{client}/{fn})
+        """
+        self.flush()
+        query, params = self.match(address)
+        query = 'SELECT data FROM txs WHERE ' + query
+        if paths != None:
+            paths = [p[:-len('.json')] if p.endswith('.json') else p for p in paths]
+            query += f' AND path IN ({",".join(["?"] * len(paths))})'
+            params += paths
+        if max_age != None:
+            query += ' AND time > ?'
+            params += [time.time() - max_age]
+        with self.connect() as conn:
+            txs = [json.loads(row[0]) for row in conn.execute(query + ' ORDER BY time', params)]
+        if features != None:
+            txs = [{k: tx.get(k) for k in features} for tx in txs]
+        return c.df(txs) if df else txs
+
+    def clear_history(self, address:str = ''):
+        self.flush()
+        query, params = self.match(address)
+        with self.connect() as conn:
+            n = conn.execute('DELETE FROM txs WHERE ' + query, params).rowcount
+        return {'success': True, 'deleted': n, 'address': address}
+
+    def match(self, address:str = '') -> tuple:
+        """
+        the condition for the paths of the address, the address itself or the paths below it (module does not match module2)
+        """
+        if address == '':
+            return '1', []
+        prefix = address.rstrip('/') + '/'
+        return '(path = ? OR (path >= ? AND path < ?))', [address.rstrip('/'), prefix, prefix + '\uffff']
+
+    def test(self, path='~/.commune/server/transactions/test'):
+        txlog = TxLog(path=path)
+        txlog.clear_history()
+        for i in range(3):
+            txlog.save_data(f'test/client/info/{time.time()}.json', {'fn': 'info', 'i': i})
+        txlog.save_data(f'test2/client/info/{time.time()}.json', {'fn': 'info', 'i': 3})
+        txs = txlog.get_history('test/client', df=False)
+        assert [tx['i'] for tx in txs] == [0, 1, 2], f'wrong txs {txs}'
+        assert len(txlog.get_history('test', df=False)) == 3, 'test matches test2'
+        assert txlog.clear_history('test')['deleted'] == 3
+        assert txlog.clear_history('test2')['deleted'] == 1
+        assert len(txlog.get_history('test', df=False)) == 0
+        # a failed write keeps the txs queued
+        db_path, txlog.db_path = txlog.db_path, txlog.path # a directory cannot be opened
+        txlog.save_data(f'test/client/info/{time.time()}.json', {'fn': 'info', 'i': 4})
+        assert txlog.flush() == 0 and txlog.queue.qsize() == 1, 'the tx was dropped'
+        txlog.db_path = db_path
+        assert txlog.clear_history('test')['deleted'] == 1
+        return {'success': True, 'msg': 'txlog test passed'}
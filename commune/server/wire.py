@@ -0,0 +1,70 @@
+import msgpack
+import msgpack_numpy
+import numpy as np
+from functools import partial
+from starlette.responses import Response
+
+class Wire:
+    """
+    the binary wire format (msgpack) for the requests and responses,
+    numpy arrays and bytes are packed as raw buffers, the decoded arrays are writeable copies
+    unless they are decoded with writeable=False (read-only views of the buffer)
+    """
+    content_type = 'application/msgpack'
+
+    def encode(self, data) -> bytes:
+        return msgpack.packb(data, default=msgpack_numpy.encode, use_bin_type=True)
+
+    def decode(self, data:bytes, writeable:bool = True):
+        return msgpack.unpackb(data, object_hook=partial(self.object_hook, writeable=writeable), raw=False)
+
+    def object_hook(self, obj:dict, writeable:bool = True):
+        """
+        rebuilds the numeric arrays and scalars packed by msgpack_numpy.encode, 
+        it never unpickles (msgpack_numpy.decode loads object arrays with pickle) so object dtypes are rejected
+        """
+        if b'nd' in obj:
+            dtype = np.dtype(obj[b'type']) if isinstance(obj[b'type'], str) else None
+            if obj.get(b'kind', b'') != b'' or dtype == None or dtype.hasobject:
+                raise ValueError(f'WireDecodeError(only numeric arrays can be decoded, got kind={obj.get(b"kind")} type={obj[b"type"]})')
+            if obj[b'nd'] is True:
+                array = np.ndarray(buffer=obj[b'data'], dtype=dtype, shape=obj[b'shape'])
+                return array.copy() if writeable else array
+            return np.frombuffer(obj[b'data'], dtype=dtype)[0]
+        if b'complex' in obj:
+            return complex(obj[b'data'])
+        return obj
+
+    def response(self, result, headers:dict):
+        """
+        the result in the wire format if the request accepts it, 
+        the result is returned as is (json) if msgpack cannot encode it (sets, datetimes, models, ...)
+        """
+        if not self.accepts(headers):
+            return result
+        try:
+            return Response(content=self.encode(result), media_type=self.content_type)
+        except (TypeError, ValueError, OverflowError):
+            return result
+
+    def accepts(self, headers:dict) -> bool:
+        return self.content_type in headers.get('accept', headers.get('Accept', ''))
+
+    def is_wire(self, headers:dict) -> bool:
+        return self.content_type in headers.get('content-type', headers.get('Content-Type', ''))
+
+    def test(self):
+        import datetime
+        data = {'array': np.arange(10, dtype='float32'), 'bytes': b'\x00\x01', 'text': 'hey', 'list': [1, 2.5, None]}
+        decoded = self.decode(self.encode(data))
+        assert np.array_equal(decoded['array'], data['array']) and decoded['array'].dtype == data['array'].dtype
+        assert decoded['bytes'] == data['bytes'] and decoded['text'] == data['text'] and decoded['list'] == data['list']
+        decoded['array'] += 1 # the inputs can be changed in place
+        assert not self.decode(self.encode(data), writeable=False)['array'].flags.writeable
+        headers = {'accept': f'{self.content_type}, application/json'}
+        assert isinstance(self.response(data, headers), Response)
+        for result in [{1, 2}, datetime.datetime.now(), object()]:
+            assert self.response(result, headers) is result, f'{type(result)} should fall back to json'
+        assert self.response(data, {'accept': 'application/json'}) is data
+        assert self.decode(self.encode({'scalar': np.float32(1.5), 'complex': 1+2j})) == {'scalar': 1.5, 'complex': 1+2j}
+        return {'success': True, 'msg': 'wire test passed'}
@@ -11,11 +11,9 @@ import urllib
 import json
 import re
 import itertools
+import threading
+import builtins
 from contextlib import contextmanager
-import requests
-import psutil
-import netaddr
-from loguru import logger
 from typing import Any, Optional, List, Dict, Tuple, Union
 import gc
 import asyncio
@@ -261,22 +259,57 @@ def bytes2str( data: bytes, mode: str = 'utf-8') -> str:
         return bytes.decode(data, mode)
 
 
+python2str_cache = {} # id(input) -> (input, output) for the immutable inputs, the input is kept so its id is not reused
+python2str_cache_size = 1024
+python2str_cache_max_length = 4096 # larger outputs are not cached so the cache does not keep large payloads alive
+python2str_lock = threading.Lock()
+
+def python2str_default(obj):
+    """
+    the json of the values nested in containers that json cannot encode, bytes as hex and numpy arrays (and scalars) as lists
+    """
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return bytes2str(obj)
+    if hasattr(obj, 'dtype') and hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
 def python2str( input):
-    from copy import deepcopy
-    import json
-    input = deepcopy(input)
+    """
+    the canonical string of the input (json for containers, hex for bytes) that is signed and hashed,
+    the input is never copied or mutated
+    """
     input_type = type(input)
     if input_type == str:
         return input
-    if input_type in [dict]:
-        input = json.dumps(input)
+    cacheable = input_type in [bytes, tuple, frozenset]
+    if cacheable:
+        cached = python2str_cache.get(id(input))
+        if cached != None and cached[0] is input:
+            return cached[1]
+    if input_type in [dict, list, tuple]:
+        output = json.dumps(input, default=python2str_default)
     elif input_type in [bytes]:
-        input = bytes2str(input)
-    elif input_type in [list, tuple, set]:
-        input = json.dumps(list(input))
+        output = bytes2str(input)
+    elif input_type in [set, frozenset]:
+        try:
+            output = json.dumps(sorted(input), default=python2str_default)
+        except TypeError:
+            output = json.dumps(sorted(input, key=repr), default=python2str_default)
     elif input_type in [int, float, bool]:
-        input = str(input)
-    return input
+        output = str(input)
+    else:
+        return input
+    if cacheable and len(output) <= python2str_cache_max_length:
+        try:
+            builtins.hash(input) # a tuple is only immutable if its items are (hash is shadowed by utils.hash)
+        except TypeError:
+            return output
+        with python2str_lock:
+            python2str_cache[id(input)] = (input, output)
+            if len(python2str_cache) > python2str_cache_size:
+                python2str_cache.pop(next(iter(python2str_cache)))
+    return output
 
 def bytes2dict(data: bytes) -> str:
     import json
@@ -786,6 +819,7 @@ def external_ip( default_ip='0.0.0.0') -> str:
             Exception(Exception):
                 Raised if all external ip attempts fail.
     """
+    import requests
     ip = None
     try:
         ip = c.cmd('curl -s ifconfig.me')
@@ -1030,6 +1064,7 @@ def ip_to_int(str_val: str) -> int:
             netaddr.core.AddrFormatError (Exception):
                 Raised when the passed str_val is not a valid ip string value.
     """
+    import netaddr
     return int(netaddr.IPAddress(str_val))
 
 
@@ -0,0 +1,198 @@
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import *
+
+class Watcher:
+    """
+    watches directories for changes of python files and calls callback(path, is_dir) for each change,
+    it uses inotify on linux and falls back to polling the mtimes of the files
+    """
+    # inotify flags (linux/inotify.h)
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+    event_format = 'iIII' # wd, mask, cookie, len
+    event_size = struct.calcsize(event_format)
+
+    def __init__(self,
+                 paths: List[str],
+                 callback: Callable,
+                 depth: int = 10, # the depth of the directories below the paths to watch
+                 interval: float = 1, # (in seconds) how often to poll
+                 mode: str = 'auto', # inotify, poll or auto (inotify if available)
+                 extension: str = '.py'):
+        paths = sorted(set([os.path.abspath(os.path.expanduser(p)) for p in paths if os.path.isdir(os.path.expanduser(p))]))
+        self.paths = [p for p in paths if not any(p.startswith(q + '/') for q in paths)] # nested paths are already watched
+        self.callback = callback
+        self.depth = depth
+        self.interval = interval
+        self.extension = extension
+        self.mode = mode
+        self.pid = os.getpid()
+        self.running = False
+
+    def start(self) -> 'Watcher':
+        self.wake_r, self.wake_w = os.pipe() # written by stop to wake the thread from select
+        if self.mode in ['auto', 'inotify']:
+            try:
+                self.start_inotify()
+                self.mode = 'inotify'
+            except OSError as e:
+                if getattr(self, 'fd', -1) >= 0:
+                    os.close(self.fd)
+                if self.mode == 'inotify':
+                    os.close(self.wake_r)
+                    os.close(self.wake_w)
+                    raise e
+                self.mode = 'poll'
+        if self.mode == 'poll':
+            self.snapshot = self.scan()
+        self.running = True
+        self.thread = threading.Thread(target=self.loop, daemon=True, name='watcher')
+        self.thread.start()
+        return self
+
+    def stop(self, timeout:float = 5):
+        """
+        wakes the thread, waits for it to exit and only then closes the file descriptors
+        """
+        if not self.running:
+            return
+        self.running = False
+        os.write(self.wake_w, b'\0')
+        if self.thread.is_alive() and self.thread != threading.current_thread():
+            self.thread.join(timeout)
+        if self.mode == 'inotify':
+            os.close(self.fd)
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+
+    def alive(self) -> bool:
+        return self.running and self.pid == os.getpid() and self.thread.is_alive()
+
+    def walk(self, path:str, depth:int = None) -> Iterator[Tuple[str, int]]:
+        """
+        yields the directories below the path (not hidden) with their remaining depth
+        """
+        depth = self.depth if depth == None else depth
+        yield path, depth
+        if depth <= 0:
+            return
+        try:
+            entries = sorted(os.scandir(path), key=lambda e: e.name)
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.') and entry.name != '__pycache__':
+                yield from self.walk(entry.path, depth - 1)
+
+    def is_source(self, path:str) -> bool:
+        return path.endswith(self.extension)
+
+    # inotify
+
+    def start_inotify(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+        self.wd2path = {}
+        self.path2depth = {}
+        for path in self.paths:
+            for dir_path, depth in self.walk(path):
+                self.add_watch(dir_path, depth)
+
+    def add_watch(self, path:str, depth:int):
+        if path in self.path2depth:
+            self.path2depth[path] = max(depth, self.path2depth[path])
+            return
+        wd = self.libc.inotify_add_watch(self.fd, path.encode(), self.mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {path} (raise fs.inotify.max_user_watches)')
+        self.wd2path[wd] = path
+        self.path2depth[path] = depth
+
+    def read_events(self) -> List[Tuple[str, int]]:
+        readable = select.select([self.fd, self.wake_r], [], [])[0]
+        if self.wake_r in readable or not self.running:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset + self.event_size <= len(data):
+            wd, mask, cookie, length = struct.unpack_from(self.event_format, data, offset)
+            name = data[offset + self.event_size: offset + self.event_size + length].rstrip(b'\0').decode()
+            offset += self.event_size + length
+            if mask & self.IN_IGNORED:
+                path = self.wd2path.pop(wd, None)
+                self.path2depth.pop(path, None)
+                continue
+            if wd in self.wd2path:
+                events.append((os.path.join(self.wd2path[wd], name) if name else self.wd2path[wd], mask))
+        return events
+
+    def inotify_loop(self):
+        for path, mask in self.read_events():
+            is_dir = bool(mask & self.IN_ISDIR) or bool(mask & self.IN_DELETE_SELF)
+            if not is_dir and mask & self.IN_CREATE:
+                continue # a created file is reported when it is closed after writing
+            if is_dir and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                depth = self.path2depth.get(os.path.dirname(path), 1) - 1
+                if depth >= 0:
+                    for dir_path, dir_depth in self.walk(path, depth):
+                        self.add_watch(dir_path, dir_depth)
+            if is_dir or self.is_source(path):
+                self.callback(path, is_dir)
+
+    # polling
+
+    def scan(self) -> Dict[str, Tuple[float, int]]:
+        """
+        the (mtime, size) of the source files and directories below the paths
+        """
+        snapshot = {}
+        for path in self.paths:
+            for dir_path, depth in self.walk(path):
+                try:
+                    snapshot[dir_path] = (os.stat(dir_path).st_mtime, -1)
+                    for entry in os.scandir(dir_path):
+                        if entry.is_file() and self.is_source(entry.path):
+                            stat = entry.stat()
+                            snapshot[entry.path] = (stat.st_mtime, stat.st_size)
+                except OSError:
+                    continue
+        return snapshot
+
+    def poll_loop(self):
+        if select.select([self.wake_r], [], [], self.interval)[0] or not self.running:
+            return
+        snapshot, old_snapshot = self.scan(), self.snapshot
+        self.snapshot = snapshot
+        for path in sorted(set(snapshot) | set(old_snapshot)):
+            if snapshot.get(path) == old_snapshot.get(path):
+                continue
+            is_dir = (snapshot.get(path) or old_snapshot.get(path))[1] == -1
+            # a directory only changes the tree if it is created or removed
+            if not is_dir or path not in snapshot or path not in old_snapshot:
+                self.callback(path, is_dir)
+
+    def loop(self):
+        while self.running:
+            try:
+                self.inotify_loop() if self.mode == 'inotify' else self.poll_loop()
+            except Exception as e:
+                if not self.running:
+                    break
+                print(f'WatcherError({e})')
+                time.sleep(self.interval)